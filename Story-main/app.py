@@ -1,14 +1,13 @@
 import streamlit as st
+import functools
 import os
-from src.story_generator import StoryGenerator
-from src.image_generator import ImageGenerator
-from src.tts_generator import TTSGenerator
-from src.export_story import StoryExporter
-from src.cleanup import clear_all_temp_files
-
-# Ensure directories exist
-os.makedirs("output_stories", exist_ok=True)
-os.makedirs("output_audio", exist_ok=True)
+import time
+from src.pipeline import get_pipeline
+from src.story_library import get_story_library
+from src.cleanup import mark_accessed, start_artifact_collector
+from src.metrics import get_metrics, start_metrics_server
+from src.sample_pool import SAMPLE_INPUTS, start_sample_pool
+from src.jobs import get_job_manager
 
 # Page config with wider layout
 st.set_page_config(
@@ -16,436 +15,42 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="collapsed"
 )
-st.markdown("""
-<style>
-    /* Fix for story view page buttons */
-    .stButton > button[type="primary"],
-    .stButton > button[data-testid="baseButton-primary"],
-    .stButton > button[kind="primary"] {
-        background-color: white !important;
-        color: black !important;
-        border: 2px solid black !important;
-        border-radius: 30px !important;
-        font-weight: bold !important;
-    }
-    
-    /* PDF Download button styling */
-    .stDownloadButton > button {
-        background-color: white !important;
-        color: black !important;
-        border: 2px solid black !important;
-        border-radius: 30px !important;
-        font-weight: bold !important;
-    }
-    
-    /* Override specific style for all buttons in the story view page */
-    [data-testid="stVerticalBlock"] .stButton > button {
-        background-color: white !important;
-        color: black !important;
-        border: 2px solid black !important;
-        border-radius: 30px !important;
-        font-weight: bold !important;
-    }
-</style>
-""", unsafe_allow_html=True)
-# Additional global CSS to fix contrast issues
-st.markdown("""
-<style>
-    /* Fix color contrast on black elements */
-    .css-1offfwp, .css-12oz5g7 {
-        color: white !important;
-    }
-    
-    /* Ensure buttons with dark backgrounds have white text */
-    button, .css-1q8dd3e {
-        color: white !important;
-    }
-    
-    /* But buttons with white backgrounds should have black text */
-    button.css-1q8dd3e.white-bg, .secondary-button {
-        color: black !important;
-    }
-    
-    /* Force color contrast for any black or dark elements */
-    .css-1q8dd3e, .css-1offfwp, .css-12oz5g7 {
-        --text-color: white !important;
-    }
-    
-    /* Fix for dark modals or overlays */
-    .dark-bg *, [style*="background-color: #000"] *, [style*="background-color: rgb(0, 0, 0)"] * {
-        color: white !important;
-    }
-    
-    /* Override Streamlit's default button styling */
-    .stButton > button {
-        color: white !important;
-        border: 2px solid black !important;
-    }
-    
-    /* Fix for white buttons specifically */
-    .stButton > button.white-btn, .stButton > button:nth-of-type(2) {
-        background-color: white !important;
-        color: black !important;
-    }
-</style>
-""", unsafe_allow_html=True)
 
-# Custom CSS for styling
-st.markdown("""
-<style>
-    /* Global Styles */
-    body {
-        font-family: 'Inter', sans-serif;
-        background-color: white !important;
-        color: black !important;
-    }
-    
-    .stApp {
-        background-color: white !important;
-    }
-</style>
-""", unsafe_allow_html=True)
-# Custom CSS for styling
-st.markdown("""
-<style>
-    /* Global Styles */
-    body {
-        font-family: 'Inter', sans-serif;
-        background-color: white !important;
-        color: black !important;
-    }
-    
-    .stApp {
-        background-color: white !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+# ===== Cached Resources =====
+# Built once per process and shared by every session, so reruns skip file reads and client setup;
+# the story pipeline is the process-wide `get_pipeline()` also used by background jobs and the sample pool
+STYLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "styles.css")
+
+@st.cache_resource
+def load_styles():
+    """Read the global stylesheet once; each rerun re-sends it in a single element"""
+    with open(STYLES_PATH, encoding="utf-8") as styles_file:
+        return f"<style>\n{styles_file.read()}</style>"
 
-# More CSS styles
-st.markdown("""
-<style>
-    /* Force all text to be black */
-    .stMarkdown, p, h1, h2, h3, h4, h5, h6, span, label, .stSelectbox, .stTextInput, .stTextArea, .stRadio, .stCheckbox {
-        color: black !important;
-    }
-    
-    /* Make sure all input fields have proper contrast and a black cursor */
-    .stTextInput > div > div > input, 
-    .stTextArea > div > div > textarea, 
-    .stSelectbox > div > div > div {
-        color: black !important;
-        background-color: white !important;
-        caret-color: black !important; /* This makes the cursor/caret black */
-    }
-    
-    /* Additional selector to ensure cursor color is black in all input elements */
-    input, textarea, [contenteditable="true"] {
-        caret-color: black !important;
-    }
-    
-    /* Make sure any black background elements have white text */
-    [style*="background-color: black"], [style*="background-color:#000000"], [style*="background-color: #000"] {
-        color: white !important;
-    }
-    
-    /* Force white text on black backgrounds for all elements */
-    .black-bg, .black-button, div[style*="background-color: black"], .stButton > button[style*="background-color: black"] {
-        color: white !important;
-    }
-    
-    /* Ensure radio buttons and checkboxes are visible */
-    .stRadio label, .stCheckbox label {
-        color: black !important;
-    }
-    
-    /* Force readable text on any button */
-    button, .stButton > button {
-        color: white !important;
-    }
-    
-    /* For any button that has a light background */
-    button[style*="background-color: white"], .stButton > button[style*="background-color: white"] {
-        color: black !important;
-    }
-    
-    /* Force background to be white */
-    .main .block-container {
-        background-color: white !important;
-    }
-    
-    /* Override the metric value and label color */
-    .stMetric > div {
-        color: black !important;
-    }
-    .stMetric > div > div > div {
-        color: black !important;
-    }
-    
-    /* Fix caption text */
-    .stImage > div > div > small {
-        color: black !important;
-    }
-    
-    /* Header Styles */
-    .header-container {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        padding: 20px 0;
-        border-bottom: 1px solid #f0f0f0;
-        margin-bottom: 20px;
-        background-color: white;
-    }
-    .header-logo {
-        font-size: 24px;
-        font-weight: bold;
-        color: black;
-    }
-    .header-nav a {
-        margin-left: 20px;
-        color: black;
-        text-decoration: none;
-    }
-    
-    /* Hero Section */
-    .hero-container {
-        text-align: center;
-        padding: 40px 0;
-        max-width: 800px;
-        margin: 0 auto;
-        background-color: white;
-    }
-    .hero-badge {
-        background-color: #f8f8f8;
-        color: black;
-        padding: 8px 16px;
-        border-radius: 20px;
-        display: inline-flex;
-        align-items: center;
-        font-size: 14px;
-        margin-bottom: 20px;
-    }
-    .hero-title {
-        font-size: 48px;
-        font-weight: bold;
-        color: black;
-        margin-bottom: 20px;
-        line-height: 1.2;
-    }
-    .hero-subtitle {
-        font-size: 18px;
-        color: black;
-        margin-bottom: 40px;
-        line-height: 1.6;
-    }
-    
-    /* Button Styles */
-    div.stButton > button {
-        background-color: #000000;
-        color: white !important; /* Force white text on black buttons */
-        padding: 12px 24px;
-        border-radius: 30px;
-        font-weight: 600;
-        border: 2px solid black;
-        width: 100%;
-        font-size: 16px;
-        margin-bottom: 10px;
-    }
-    div.stButton > button:hover {
-        background-color: white;
-        color: black !important; /* Force black text on white hover */
-        border: 2px solid black;
-    }
-    
-    /* First button (Create Story) */
-    div.stButton > button:nth-of-type(1) {
-        background-color: #000000;
-        color: white !important;
-    }
-    
-    /* Second button (View Sample) */
-    div.stButton > button:nth-of-type(2) {
-        background-color: white;
-        color: black !important;
-        border: 2px solid black;
-    }
-    
-    div.stButton > button:nth-of-type(2):hover {
-        background-color: #f0f0f0;
-    }
-    
-    /* Form Styles */
-    .form-container {
-        max-width: 1000px;
-        margin: 0 auto;
-        padding: 30px;
-        background-color: white;
-        border-radius: 12px;
-        border: 1px solid #e0e0e0;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.05);
-    }
-    .form-title {
-        font-size: 32px;
-        font-weight: bold;
-        text-align: center;
-        margin-bottom: 10px;
-        color: black;
-    }
-    .form-subtitle {
-        font-size: 16px;
-        color: black;
-        text-align: center;
-        margin-bottom: 30px;
-    }
-    .form-row {
-        display: flex;
-        gap: 20px;
-        margin-bottom: 20px;
-    }
-    .form-group {
-        flex: 1;
-    }
-    .form-label {
-        font-weight: 500;
-        margin-bottom: 8px;
-        display: flex;
-        align-items: center;
-        gap: 8px;
-        color: black;
-    }
-    .form-input, .form-select {
-        width: 100%;
-        padding: 12px;
-        border: 1px solid black;
-        border-radius: 8px;
-        font-size: 16px;
-        background-color: white;
-        color: black;
-    }
-    
-    /* Story Container */
-    .story-container {
-        max-width: 800px;
-        margin: 40px auto;
-        padding: 30px;
-        background-color: white;
-        border-radius: 12px;
-        box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        border: 1px solid #e0e0e0;
-    }
-    .story-title {
-        font-size: 32px;
-        font-weight: bold;
-        margin-bottom: 20px;
-        text-align: center;
-        color: black;
-    }
-    .story-content {
-        font-size: 18px;
-        line-height: 1.6;
-        color: black;
-    }
-    
-    /* Feature Icons */
-    .feature-icons {
-        display: flex;
-        justify-content: center;
-        gap: 80px;
-        margin-top: 60px;
-        background-color: white;
-    }
-    .feature-icon {
-        font-size: 32px;
-        color: black;
-        text-align: center;
-    }
-    
-    /* Length Selector Buttons */
-    .length-selector {
-        display: flex;
-        gap: 10px;
-        background-color: white;
-    }
-    .length-button {
-        flex: 1;
-        text-align: center;
-        padding: 12px;
-        border: 1px solid black;
-        border-radius: 8px;
-        cursor: pointer;
-        color: black;
-        background-color: white;
-    }
-    .length-button.active {
-        background-color: black;
-        color: white;
-        border-color: black;
-    }
-    
-    /* Audio Player Styling */
-    .audio-container {
-        display: flex;
-        align-items: center;
-        gap: 10px;
-        margin-top: 20px;
-        background-color: white;
-        border: 1px solid #e0e0e0;
-        padding: 15px;
-        border-radius: 10px;
-    }
-    .audio-button {
-        background-color: black;
-        color: white;
-        padding: 8px 16px;
-        border-radius: 30px;
-        font-weight: 600;
-        cursor: pointer;
-    }
-    
-    /* Image Container */
-    .image-container {
-        margin: 20px 0;
-        border-radius: 12px;
-        overflow: hidden;
-        border: 1px solid #e0e0e0;
-    }
-    
-    /* Custom Tabs */
-    .custom-tabs {
-        display: flex;
-        border-bottom: 1px solid black;
-        margin-bottom: 20px;
-        background-color: white;
-    }
-    .tab-item {
-        padding: 10px 20px;
-        cursor: pointer;
-        border-bottom: 2px solid transparent;
-        color: black;
-    }
-    .tab-item.active {
-        border-bottom: 2px solid black;
-        font-weight: bold;
-    }
-    
-    /* Utility Classes */
-    .mt-20 {margin-top: 20px;}
-    .mt-40 {margin-top: 40px;}
-    .text-center {text-align: center;}
-</style>
-""", unsafe_allow_html=True)
+# Streamlit drops elements a rerun does not emit, so the cached stylesheet is sent every time
+st.markdown(load_styles(), unsafe_allow_html=True)
 
 # ===== Initialize Session State =====
-# Only clear temp files once when the app starts
+# Artifacts live in the shared content-addressed store; old files are evicted in the background
 if "initialized" not in st.session_state:
     st.session_state.initialized = True
-    clear_all_temp_files()
+    start_artifact_collector()
+    start_metrics_server()
+    start_sample_pool()
 
 # Initialize all session state variables
 if "page" not in st.session_state:
-    st.session_state.page = "home"  # Options: home, create_form, story_view
+    st.session_state.page = "home"  # Options: home, create_form, generating, story_view, library
+
+# A `?job=<id>` link reattaches a refreshed or reconnected browser to its running generation
+if "job" in st.query_params and st.session_state.get("job_id") != st.query_params["job"]:
+    st.session_state.job_id = st.query_params["job"]
+    st.session_state.page = "generating"
+
+if "library_page" not in st.session_state:
+    st.session_state.library_page = 1
 
-for key in ["story", "title", "image_url", "pdf_path", "audio_file", "story_generated", "play_audio", "length"]:
+for key in ["story", "title", "image_path", "audio_file", "story_generated", "play_audio", "length"]:
     if key not in st.session_state:
         st.session_state[key] = None
 
@@ -462,49 +67,101 @@ def go_to_page(page):
     """Change the current page"""
     st.session_state.page = page
     
+def render_story_html(title, story):
+    """Build the story card markup shared by the story view and live generation"""
+    story_html = story.replace('\n', '<br>')
+    return f"""
+        <div class="story-container">
+            <h1 class="story-title">{title}</h1>
+            <div class="story-content">
+                {story_html}
+            </div>
+        </div>
+        """
+
+def store_story_result(result):
+    """Copy a pipeline result into session state and open the story view"""
+    st.session_state.title = result["title"]
+    st.session_state.story = result["story"]
+    st.session_state.image_path = result["image_path"]
+    st.session_state.audio_file = result["audio_file"]
+    # Exports are built on demand; warm the PDF in the background while the story is read
+    get_pipeline().exporter.prerender_pdf(result["title"], result["story"], result["image_path"])
+    st.session_state.story_generated = True
+    st.session_state.play_audio = False
+    go_to_page("story_view")
+
+def open_library_story(story_id):
+    """Load a story from the library into the story view without generating anything"""
+    record = get_story_library().get_story(story_id)
+    if not record:
+        st.error("That story is no longer in the library.")
+        return
+    image_path = record["image_path"] if record["image_path"] and os.path.exists(record["image_path"]) else None
+    audio_path = record["audio_path"] if record["audio_path"] and os.path.exists(record["audio_path"]) else None
+    st.session_state.current_genre = record["genre"]
+    store_story_result({
+        "title": record["title"],
+        "story": record["story"],
+        "image_path": image_path,
+        "audio_file": audio_path,
+    })
+
+def change_library_page(delta):
+    """Move the library browser forwards or backwards by one page"""
+    st.session_state.library_page = max(1, st.session_state.library_page + delta)
+
+def start_generation_job(genre, length, topic, character_name, keywords, **options):
+    """Queue a generation in the background and show its progress page"""
+    job_id = get_job_manager().submit(genre, length, topic, character_name, keywords, **options)
+    st.session_state.job_id = job_id
+    st.query_params["job"] = job_id
+    go_to_page("generating")
+
+def finish_generation_job(job):
+    """Move a finished job's result into the story view"""
+    st.session_state.current_genre = job.params["genre"]
+    st.query_params.pop("job", None)
+    store_story_result(job.result)
+
 def create_sample_story():
-    """Generate a sample story with default values"""
-    with st.spinner("Generating a sample story..."):
-        # Default values for sample story
-        genre = "Fantasy"
-        length = 250
-        topic = "A magical adventure in an enchanted forest"
-        character_name = "Emma"
-        keywords = "magic, forest, adventure, discovery, ancient secrets"
-        
-        # Generate story
-        story_gen = StoryGenerator()
-        title, story = story_gen.generate_story(genre, length, topic, character_name, keywords)
-        
-        if story:
-            # Store story in session state
-            st.session_state.title = title.strip().replace('"', '')
-            st.session_state.story = story
-            st.session_state.story_generated = True
-            st.session_state.play_audio = False
-            
-            # Export as text
-            exporter = StoryExporter()
-            exporter.save_story_txt(st.session_state.title, st.session_state.story)
-            
-            # Generate image
-            image_gen = ImageGenerator()
-            image_url = image_gen.generate_image(genre, topic, keywords)
-            st.session_state.image_url = image_url
-            
-            # Generate speech
-            tts_gen = TTSGenerator()
-            st.session_state.audio_file = tts_gen.generate_speech(st.session_state.story)
-            
-            # Generate PDF
-            st.session_state.pdf_path = exporter.save_story_pdf(
-                st.session_state.title, 
-                st.session_state.story, 
-                st.session_state.image_url
+    """Show a sample story, served from the pre-generated pool when one is ready"""
+    pool = start_sample_pool()
+    result = pool.take() if pool else None
+    if result:
+        st.session_state.current_genre = SAMPLE_INPUTS["genre"]
+        store_story_result(result)
+    else:
+        # Pool is empty (or disabled): generate one in the background with the same defaults
+        start_generation_job(**SAMPLE_INPUTS)
+
+# ===== Admin Panel =====
+# Opened with `?admin=1`; shows per-stage latency percentiles in the sidebar
+if st.query_params.get("admin") == "1":
+    with st.sidebar:
+        st.markdown("<h3 style='color: black;'>Pipeline Metrics</h3>", unsafe_allow_html=True)
+        stage_stats = get_metrics().percentiles()
+        if stage_stats:
+            st.dataframe(
+                [
+                    {
+                        "stage": stage,
+                        "count": stats["count"],
+                        "p50 (s)": round(stats["p50"], 2),
+                        "p95 (s)": round(stats["p95"], 2),
+                        "p99 (s)": round(stats["p99"], 2),
+                        "errors": f"{stats['error_rate']:.0%}",
+                        "MB": round(stats["bytes"] / 1e6, 2),
+                    }
+                    for stage, stats in sorted(stage_stats.items())
+                ],
+                hide_index=True,
+                use_container_width=True
             )
-            
-            # Change to story view page
-            go_to_page("story_view")
+        else:
+            st.caption("No stages recorded yet.")
+        with st.expander("Prometheus metrics"):
+            st.code(get_metrics().prometheus_text(), language="text")
 
 # ===== Header =====
 # Use Streamlit columns for header to avoid HTML rendering issues
@@ -527,67 +184,9 @@ if st.session_state.page == "home":
     </div>
     """, unsafe_allow_html=True)
     
-    # Button Container - Using Streamlit columns for layout instead of HTML
-    st.markdown("""
-    <style>
-    /* Special style for the main buttons */
-    .main-button-black {
-        background-color: black;
-        color: white !important;
-        padding: 15px 30px;
-        border-radius: 30px;
-        font-weight: bold;
-        text-align: center;
-        margin: 10px 0;
-        font-size: 18px;
-        cursor: pointer;
-        border: 2px solid black;
-    }
-    .main-button-white {
-        background-color: white;
-        color: black !important;
-        padding: 15px 30px;
-        border-radius: 30px;
-        font-weight: bold;
-        text-align: center;
-        margin: 10px 0;
-        font-size: 18px;
-        cursor: pointer;
-        border: 2px solid black;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-    
-    # Button Container - Using Streamlit columns for side-by-side buttons
-    # Button Container - Using Streamlit columns for side-by-side buttons
+    # Button Container - Using Streamlit columns for side-by-side buttons (styled in static/styles.css)
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        # Additional CSS to ensure the buttons display properly
-        st.markdown("""
-        <style>
-        /* Make both buttons white with black text */
-        div.stButton button {
-            color: black !important;
-            background-color: white !important;
-            font-weight: bold !important;
-            border: 2px solid black !important;
-            border-radius: 30px !important;
-            padding: 12px 24px !important;
-        }
-        
-        div.stButton button:hover {
-            background-color: #f7f7f7 !important;
-        }
-        
-        /* Make buttons display side by side */
-        div.row-widget.stButton {
-            display: inline-block;
-            width: 48%;
-            margin-right: 2%;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-        
         # Side-by-side buttons with consistent styling
         button_cols = st.columns(2)
         with button_cols[0]:
@@ -595,8 +194,11 @@ if st.session_state.page == "home":
                 go_to_page("create_form")
                 
         with button_cols[1]:
-            if st.button("View Sample Story", key="view_sample_btn", use_container_width=True):
-                create_sample_story()
+            st.button("View Sample Story", key="view_sample_btn", use_container_width=True,
+                      on_click=create_sample_story)
+        
+        if st.button("Browse Story Library", key="browse_library_btn", use_container_width=True):
+            go_to_page("library")
 
 elif st.session_state.page == "create_form":
     # Story Creation Form with improved styling
@@ -629,34 +231,10 @@ elif st.session_state.page == "create_form":
     
     with col1:
         st.markdown('<div style="font-weight: 500; margin-bottom: 8px; color: black;"> Length</div>', unsafe_allow_html=True)
-        length_options = {"Short": 250, "Medium": 500, "Long": 750}
+        # Novelette and longer are written chapter by chapter (see LongFormWriter)
+        length_options = {"Short": 250, "Medium": 500, "Long": 750, "Novelette": 5000, "Novella": 10000, "Book": 20000}
         
-        # Custom CSS to make radio buttons more visible
-        st.markdown("""
-        <style>
-        .stRadio > div {
-            color: black !important;
-            font-weight: 500;
-        }
-        .stRadio > div > div > label {
-            color: black !important;
-            font-weight: 500;
-        }
-        /* Make active radio button text white on black background */
-        .stRadio > div > div > label[data-baseweb="radio"] > div > div:first-child {
-            background-color: black;
-        }
-        .stRadio > div > div > label[data-baseweb="radio"] > div > div:first-child > div {
-            background-color: white;
-        }
-        /* Make sure the radio button itself is visible */
-        .stRadio > div > div > label > div > div {
-            border-color: black !important;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-        
-        length_choice = st.radio("", ["Short", "Medium", "Long"], horizontal=True, index=0, key="length_radio")
+        length_choice = st.radio("", list(length_options), horizontal=True, index=0, key="length_radio")
         length = length_options[length_choice]
     
     with col2:
@@ -685,16 +263,6 @@ elif st.session_state.page == "create_form":
     st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
     st.markdown('<div style="font-weight: 500; margin-bottom: 8px; color: black;">Options</div>', unsafe_allow_html=True)
     
-    # Custom CSS for checkboxes
-    st.markdown("""
-    <style>
-    .stCheckbox > div > div > label {
-        color: black !important;
-        font-weight: 500;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -703,6 +271,8 @@ elif st.session_state.page == "create_form":
     with col2:
         generate_speech = st.checkbox("Generate audio narration", value=True, key="gen_audio_check")
     
+    fresh_story = st.checkbox("Write a new story even if these details were used before", value=False, key="fresh_story_check")
+    
     # Generate Button (centered) with custom styling
     # Generate Button (centered) with consistent white background styling
     # Generate Button with simpler CSS targeting
@@ -711,21 +281,6 @@ elif st.session_state.page == "create_form":
     # Generate Story Button with clean styling
     st.markdown("<div style='height: 30px;'></div>", unsafe_allow_html=True)
     
-    # Clear styling overrides for this specific button
-    st.markdown("""
-    <style>
-    /* Override any existing button styles for this specific button */
-    div[data-testid="stVerticalBlock"] > div:last-child button {
-        background-color: white !important;
-        color: black !important;
-        border: 2px solid black !important;
-        border-radius: 30px !important;
-        font-weight: bold !important;
-        padding: 10px 24px !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-    
     # Create centered column layout
     col1, col2, col3 = st.columns([1, 1, 1])
     
@@ -744,44 +299,99 @@ elif st.session_state.page == "create_form":
             # Combine setting and era into the topic for better context
             full_topic = f"{topic} set in {setting} during {era}"
             
-            with st.spinner(" Creating your magical story..."):
-                story_gen = StoryGenerator()
-                title, story = story_gen.generate_story(genre, length, full_topic, character_name, keywords)
-                
-                if story:
-                    # Store story in session state
-                    st.session_state.title = title.strip().replace('"', '')
-                    st.session_state.story = story
-                    st.session_state.story_generated = True
-                    st.session_state.play_audio = False
-                    
-                    # Export as text
-                    exporter = StoryExporter()
-                    exporter.save_story_txt(st.session_state.title, st.session_state.story)
-            
-            # Generate Image
-            if generate_image:
-                with st.spinner(" Creating illustration..."):
-                    image_gen = ImageGenerator()
-                    image_url = image_gen.generate_image(genre, full_topic, keywords)
-                    st.session_state.image_url = image_url
+            # Runs on the job workers, so reruns, refreshes and dropped connections don't cancel it
+            start_generation_job(
+                genre, length, full_topic, character_name, keywords,
+                generate_image=generate_image,
+                generate_speech=generate_speech,
+                refresh_story=fresh_story
+            )
+            st.rerun()
+
+elif st.session_state.page == "generating":
+    job = get_job_manager().get(st.session_state.get("job_id"))
+    
+    if job is None:
+        st.query_params.pop("job", None)
+        st.error("This generation is no longer available. It may have expired or the server restarted.")
+        st.button(" Create a New Story", on_click=lambda: go_to_page("create_form"), key="job_missing_btn")
+    elif job.status == "done":
+        finish_generation_job(job)
+        st.rerun()
+    elif job.status == "failed":
+        st.query_params.pop("job", None)
+        st.error(job.error or "Story generation failed. Please try again.")
+        st.button(" Try Again", on_click=lambda: go_to_page("create_form"), key="job_retry_btn")
+    else:
+        stage_labels = {"story": "Story", "image": "Illustration", "speech": "Narration"}
+        stage_icons = {"pending": "⏳", "running": "✍️", "done": "✅", "failed": "⚠️"}
+        
+        @st.fragment(run_every=1)
+        def show_job_progress():
+            """Poll the background job and redraw its progress; a full rerun picks up the outcome"""
+            if job.finished:
+                st.rerun()
             
-            # Generate Speech
-            if generate_speech:
-                with st.spinner(" Creating audio narration..."):
-                    tts_gen = TTSGenerator()
-                    st.session_state.audio_file = tts_gen.generate_speech(st.session_state.story)
+            stage_cols = st.columns(len(job.stages))
+            for stage_col, (stage, status) in zip(stage_cols, job.stages.items()):
+                with stage_col:
+                    st.markdown(f"<div style='text-align: center; color: black;'>{stage_icons[status]} {stage_labels[stage]}</div>", unsafe_allow_html=True)
             
-            # Generate PDF
-            with st.spinner(" Finalizing your story..."):
-                st.session_state.pdf_path = exporter.save_story_pdf(
-                    st.session_state.title, 
-                    st.session_state.story, 
-                    st.session_state.image_url
-                )
+            # Start narration playback from the first synthesized chunk
+            if job.audio_preview:
+                st.markdown('<div style="font-weight: 500; color: black;"> Read Aloud (preview)</div>', unsafe_allow_html=True)
+                st.audio(job.audio_preview, format="audio/mp3")
             
-            # Change to story view page
-            go_to_page("story_view")
+            # Render the story as it streams in, before the title and artifacts are ready
+            if job.partial_story:
+                st.markdown(render_story_html("Writing your story...", job.partial_story), unsafe_allow_html=True)
+            else:
+                st.markdown("<p style='color: black; text-align: center;'> Creating your story, illustration and narration...</p>", unsafe_allow_html=True)
+        
+        show_job_progress()
+
+elif st.session_state.page == "library":
+    st.markdown("""
+    <div style="background-color: white; padding: 30px; border-radius: 10px; border: 1px solid #e0e0e0;">
+        <h2 style="font-size: 32px; font-weight: bold; text-align: center; color: black;">Story Library</h2>
+        <p style="font-size: 16px; color: black; text-align: center; margin-bottom: 30px;">Reopen or search every story generated so far</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown('<div style="font-weight: 500; margin-top: 20px; margin-bottom: 8px; color: black;"> Search</div>', unsafe_allow_html=True)
+    query = st.text_input("", key="library_query", placeholder="Title, theme, keywords or any words from the story",
+                          on_change=lambda: setattr(st.session_state, "library_page", 1))
+    
+    page_size = 10
+    stories, total = get_story_library().search(query, st.session_state.library_page, page_size)
+    page_count = max(1, (total + page_size - 1) // page_size)
+    
+    if not stories:
+        st.markdown("<p style='color: black;'>No stories found.</p>", unsafe_allow_html=True)
+    
+    for entry in stories:
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["created_at"]))
+        entry_col1, entry_col2 = st.columns([4, 1])
+        with entry_col1:
+            st.markdown(f"<h4 style='color: black; margin-bottom: 0;'>{entry['title']}</h4>", unsafe_allow_html=True)
+            st.caption(f"{entry['genre']} · {entry['word_count']} words · {created}")
+            st.markdown(entry["snippet"])
+        with entry_col2:
+            st.button("Open", key=f"open_story_{entry['id']}", on_click=open_library_story, args=(entry["id"],),
+                      use_container_width=True)
+        st.markdown("<hr style='border-color: #e0e0e0;'>", unsafe_allow_html=True)
+    
+    nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1])
+    with nav_col1:
+        st.button("← Previous", key="library_prev_btn", on_click=change_library_page, args=(-1,),
+                  disabled=st.session_state.library_page <= 1, use_container_width=True)
+    with nav_col2:
+        st.markdown(f"<p style='color: black; text-align: center;'>Page {st.session_state.library_page} of {page_count} · {total} stories</p>", unsafe_allow_html=True)
+    with nav_col3:
+        st.button("Next →", key="library_next_btn", on_click=change_library_page, args=(1,),
+                  disabled=st.session_state.library_page >= page_count, use_container_width=True)
+    
+    st.button(" Create a New Story", on_click=lambda: go_to_page("create_form"), key="library_create_btn")
 
 elif st.session_state.page == "story_view" and st.session_state.story_generated:
     # Story View Page with improved layout
@@ -791,14 +401,7 @@ elif st.session_state.page == "story_view" and st.session_state.story_generated:
     
     with col1:
         # Story Content
-        st.markdown(f"""
-        <div class="story-container">
-            <h1 class="story-title">{st.session_state.title}</h1>
-            <div class="story-content">
-                {st.session_state.story.replace('\n', '<br>')}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(render_story_html(st.session_state.title, st.session_state.story), unsafe_allow_html=True)
         
         # Audio Player
         if st.session_state.audio_file and os.path.exists(st.session_state.audio_file):
@@ -813,33 +416,31 @@ elif st.session_state.page == "story_view" and st.session_state.story_generated:
             
             with audio_col2:
                 if st.session_state.play_audio:
+                    mark_accessed(st.session_state.audio_file)
                     st.audio(st.session_state.audio_file, format="audio/mp3")
             
             st.markdown("</div>", unsafe_allow_html=True)
         
-        # PDF Download Button
-        if st.session_state.pdf_path and os.path.exists(st.session_state.pdf_path):
-            try:
-                
-                with open(st.session_state.pdf_path, "rb") as file:
-                    st.download_button(
-                        " Download Story as PDF",
-                        file,
-                        file_name=f"{st.session_state.title}.pdf",
-                        mime="application/pdf",
-                        use_container_width=True
-                    )
-            except Exception as e:
-                st.error(f"Error preparing PDF download: {str(e)}")
-        elif st.session_state.pdf_path:
-            st.warning("PDF file not found. It may have been deleted.")
+        # PDF Download Button; the PDF is built (or fetched from the store) only when clicked
+        st.download_button(
+            " Download Story as PDF",
+            functools.partial(get_pipeline().exporter.get_story_pdf,
+                              st.session_state.title, st.session_state.story, st.session_state.image_path),
+            file_name=f"{st.session_state.title}.pdf",
+            mime="application/pdf",
+            use_container_width=True
+        )
     
     with col2:
         # Story Image
-        if st.session_state.image_url:
+        if st.session_state.image_path and os.path.exists(st.session_state.image_path):
+            mark_accessed(st.session_state.image_path)
+            # Display-size WebP copy, created once per image and shared by every session
+            display_path = get_pipeline().derivatives.display(st.session_state.image_path)
+            mark_accessed(display_path)
             st.markdown('<div class="image-container">', unsafe_allow_html=True)
             st.image(
-                st.session_state.image_url,
+                display_path,
                 caption=f"Illustration for '{st.session_state.title}'",
                 use_container_width=True
             )
@@ -865,6 +466,11 @@ elif st.session_state.page == "story_view" and st.session_state.story_generated:
         on_click=lambda: go_to_page("create_form"), 
         key="create_another_btn",
         type="secondary")
+        
+        st.button(" Browse Story Library", 
+        on_click=lambda: go_to_page("library"), 
+        key="story_library_btn",
+        type="secondary")
     
     st.markdown("</div>", unsafe_allow_html=True)
 
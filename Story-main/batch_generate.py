@@ -0,0 +1,151 @@
+"""Generate stories in bulk without the Streamlit UI.
+
+Usage:
+    python batch_generate.py stories.jsonl --output-dir batch_output --concurrency 4
+
+Each input row (JSONL object or CSV record) has the columns
+`genre, length, topic, character_name, keywords, image, speech` and an optional `id`.
+Results are appended to `<output-dir>/manifest.jsonl`; rows already recorded there
+are skipped, so an interrupted run can simply be started again.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.pipeline import StoryPipeline
+
+def parse_bool(value, default=True):
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+def load_rows(input_path):
+    """Read rows from a JSONL or CSV file."""
+    with open(input_path, encoding="utf-8", newline="") as input_file:
+        if input_path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(input_file))
+        else:
+            rows = [json.loads(line) for line in input_file if line.strip()]
+
+    for row in rows:
+        row["length"] = int(row.get("length") or 250)
+        row["image"] = parse_bool(row.get("image"))
+        row["speech"] = parse_bool(row.get("speech"))
+        if not row.get("id"):
+            # Identical inputs map to the same id, which is what makes resuming work
+            fields = [row.get(k) for k in ("genre", "length", "topic", "character_name", "keywords", "image", "speech")]
+            row["id"] = hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()[:16]
+    return rows
+
+def load_finished_ids(manifest_path):
+    if not os.path.exists(manifest_path):
+        return set()
+    with open(manifest_path, encoding="utf-8") as manifest:
+        return {entry["id"] for entry in map(json.loads, filter(str.strip, manifest)) if entry.get("status") == "ok"}
+
+def write_artifacts(row_dir, result, exporter):
+    """Write the story text, PDF, illustration and narration for one row."""
+    os.makedirs(row_dir, exist_ok=True)
+    artifacts = {}
+
+    artifacts["txt"] = os.path.join(row_dir, "story.txt")
+    with open(artifacts["txt"], "w", encoding="utf-8") as txt_file:
+        txt_file.write(f"{result['title']}\n\n{result['story']}")
+
+    # The pipeline leaves exports to the caller; a batch run always wants the PDF
+    artifacts["pdf"] = os.path.join(row_dir, "story.pdf")
+    pdf_start = time.perf_counter()
+    shutil.copyfile(exporter.save_story_pdf(result["title"], result["story"], result["image_path"]), artifacts["pdf"])
+    result["timings"]["pdf"] = time.perf_counter() - pdf_start
+
+    if result["image_path"]:
+        artifacts["image"] = os.path.join(row_dir, "illustration" + os.path.splitext(result["image_path"])[1])
+        shutil.copyfile(result["image_path"], artifacts["image"])
+
+    if result["audio_file"]:
+        artifacts["audio"] = os.path.join(row_dir, "narration.mp3")
+        shutil.copyfile(result["audio_file"], artifacts["audio"])
+
+    return artifacts
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def print_summary(records, elapsed):
+    succeeded = [r for r in records if r["status"] == "ok"]
+    print(f"\n✅ {len(succeeded)}/{len(records)} stories in {elapsed:.1f}s "
+          f"({len(succeeded) / elapsed * 60 if elapsed else 0:.1f} stories/min)")
+
+    stages = sorted({stage for r in succeeded for stage in r["timings"]})
+    if not stages:
+        return
+    print(f"{'stage':<10}{'count':>7}{'mean':>9}{'p50':>9}{'p95':>9}{'max':>9}")
+    for stage in stages:
+        values = [r["timings"][stage] for r in succeeded if stage in r["timings"]]
+        print(f"{stage:<10}{len(values):>7}{statistics.mean(values):>8.2f}s"
+              f"{percentile(values, 0.5):>8.2f}s{percentile(values, 0.95):>8.2f}s{max(values):>8.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate stories in bulk from a JSONL or CSV file.")
+    parser.add_argument("input", help="JSONL or CSV file with one story request per row")
+    parser.add_argument("--output-dir", default="batch_output", help="Where to write artifacts and the manifest")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of stories generated at once")
+    parser.add_argument("--refresh", action="store_true", help="Bypass the story cache")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = os.path.join(args.output_dir, "manifest.jsonl")
+    finished = load_finished_ids(manifest_path)
+    rows = [row for row in load_rows(args.input) if row["id"] not in finished]
+    print(f"📚 {len(rows)} stories to generate ({len(finished)} already done)")
+
+    pipeline = StoryPipeline()
+    manifest_lock = threading.Lock()
+
+    def process(row):
+        start = time.perf_counter()
+        record = {"id": row["id"], "status": "failed", "timings": {}}
+        try:
+            result = pipeline.run(
+                row.get("genre", "Fantasy"), row["length"], row.get("topic", ""),
+                row.get("character_name", ""), row.get("keywords", ""),
+                generate_image=row["image"], generate_speech=row["speech"], refresh_story=args.refresh
+            )
+            if result:
+                record.update(
+                    status="ok",
+                    title=result["title"],
+                    artifacts=write_artifacts(os.path.join(args.output_dir, row["id"]), result, pipeline.exporter),
+                    timings=result["timings"],
+                )
+        except Exception as e:
+            record["error"] = str(e)
+        record["timings"]["total"] = time.perf_counter() - start
+
+        with manifest_lock:
+            with open(manifest_path, "a", encoding="utf-8") as manifest:
+                manifest.write(json.dumps(record) + "\n")
+        return record
+
+    start = time.perf_counter()
+    records = []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in as_completed([pool.submit(process, row) for row in rows]):
+            record = future.result()
+            records.append(record)
+            status = "✔" if record["status"] == "ok" else f"⚠️ {record.get('error', 'no story returned')}"
+            print(f"[{len(records)}/{len(rows)}] {record['id']} {status}")
+
+    print_summary(records, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
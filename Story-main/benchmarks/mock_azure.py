@@ -0,0 +1,214 @@
+"""Local stand-in for the Azure OpenAI chat, DALL·E and TTS endpoints.
+
+Usage:
+    python -m benchmarks.mock_azure --port 8765 --latency 0.5 --error-rate 0.05
+
+Routes mirror the three endpoints the app calls:
+    POST /chat    chat completions (plain JSON or `stream: true` server-sent events), including
+                  long-form outlines and stitching requests
+    POST /images  image generation (`b64_json` or a `url` served from /files/)
+    POST /tts     speech synthesis (MP3-shaped bytes sized to the input text)
+
+Point the app at it with AZURE_OPENAI_API_ENDPOINT, DALLE_API_ENDPOINT and
+AZURE_TTS_ENDPOINT set to `http://127.0.0.1:<port>/chat` (and `/images`, `/tts`).
+"""
+import argparse
+import base64
+import io
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "the forest whispered ancient secrets while lanterns flickered along the winding path "
+    "and a curious traveller followed the silver river toward a hidden castle where dragons "
+    "slept beneath mossy stones and stars drifted above the quiet valley"
+).split()
+
+@dataclass
+class MockConfig:
+    latency: float = 0.2           # Mean response latency in seconds
+    jitter: float = 0.1            # Uniform +/- jitter around the mean
+    error_rate: float = 0.0        # Fraction of requests answered with 500 or 429
+    stream_chunk_words: int = 8    # Words per server-sent event when streaming
+    image_size: int = 1024         # Edge length of generated illustrations
+    audio_bytes_per_char: int = 60 # Roughly tts-1 MP3 size per input character
+    tokens_per_word: float = 1.3   # Completions longer than `max_tokens` are cut off with finish_reason "length"
+
+def lorem(word_count: int):
+    """Deterministic filler prose with paragraph breaks."""
+    words = [WORDS[i % len(WORDS)] for i in range(word_count)]
+    paragraphs = [" ".join(words[i:i + 60]).capitalize() + "." for i in range(0, len(words), 60)]
+    return "\n\n".join(paragraphs)
+
+def noise_image(size: int):
+    """A JPEG of random noise, so its size resembles a real illustration."""
+    from PIL import Image
+    image = Image.frombytes("RGB", (size, size), random.randbytes(size * size * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+def fake_mp3(byte_count: int):
+    """ID3 header followed by MPEG frame sync words and filler."""
+    frame = b"\xff\xfb\x90\x64" + bytes(413)
+    body = frame * max(1, byte_count // len(frame))
+    return b"ID3\x04\x00\x00\x00\x00\x00\x00" + body
+
+class MockAzureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real service
+    config = MockConfig()
+    files = {}
+    files_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body: bytes, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate(self):
+        """Sleep for the configured latency; return False if this request should fail."""
+        config = self.config
+        time.sleep(max(0.0, config.latency + random.uniform(-config.jitter, config.jitter)))
+        if random.random() < config.error_rate:
+            if random.random() < 0.5:
+                self._send(429, b'{"error": "rate limited"}', headers={"Retry-After": "1"})
+            else:
+                self._send(500, b'{"error": "mock failure"}')
+            return False
+        return True
+
+    def do_GET(self):
+        if self.path.startswith("/files/"):
+            with self.files_lock:
+                body = self.files.get(self.path[len("/files/"):])
+            if body is not None:
+                self._send(200, body, content_type="image/jpeg")
+                return
+        self._send(404, b"{}")
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self._simulate():
+            return
+        route = self.path.split("?")[0]
+        if route == "/chat":
+            self._chat(payload)
+        elif route == "/images":
+            self._images(payload)
+        elif route == "/tts":
+            audio = fake_mp3(len(payload.get("input", "")) * self.config.audio_bytes_per_char)
+            self._send(200, audio, content_type="audio/mpeg")
+        else:
+            self._send(404, b"{}")
+
+    def _chat(self, payload):
+        messages = payload["messages"]
+        prompt = messages[-1]["content"]
+        match = re.search(r"approximately (\d+) words", prompt)
+        chapters = re.search(r"in exactly (\d+) chapters", prompt)
+        max_tokens = payload.get("max_tokens", 300)
+        if chapters:
+            text = json.dumps({
+                "title": "The Whispering Forest", "brief": lorem(40),
+                "chapters": [{"title": f"Part {i + 1}", "summary": lorem(30)} for i in range(int(chapters.group(1)))],
+            })
+        elif "Revise the opening paragraph" in prompt:
+            opening = prompt.split("opening paragraph of the next chapter:\n\n")[1].split("\n\n")[0]
+            text = lorem(len(opening.split()))
+        elif match:
+            text = lorem(int(match.group(1)))
+            if "Title:" in prompt:
+                text = f"Title: The Whispering Forest\n\n{text}"
+        elif len(messages) > 1:
+            text = lorem(max(5, int(max_tokens / 1.5 / self.config.tokens_per_word)))  # A continuation
+        else:
+            text = lorem(max(5, int(max_tokens / 1.5)))
+        words = text.split(" ")
+        finish_reason = "stop"
+        if len(words) * self.config.tokens_per_word > max_tokens:
+            words = words[:int(max_tokens / self.config.tokens_per_word)]
+            text = " ".join(words)
+            finish_reason = "length"
+        completion_tokens = int(len(words) * self.config.tokens_per_word)
+
+        if not payload.get("stream"):
+            body = {"choices": [{"message": {"content": text}, "finish_reason": finish_reason}],
+                    "usage": {"completion_tokens": completion_tokens}}
+            self._send(200, json.dumps(body).encode("utf-8"))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        step = self.config.stream_chunk_words
+        events = [{"choices": [{"delta": {"content": " ".join(words[i:i + step]) + " "}}]}
+                  for i in range(0, len(words), step)]
+        events.append({"choices": [{"delta": {}, "finish_reason": finish_reason}]})
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            events.append({"choices": [], "usage": {"completion_tokens": completion_tokens}})
+        for event in events:
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def _images(self, payload):
+        image = noise_image(self.config.image_size)
+        if payload.get("response_format") == "b64_json":
+            data = {"b64_json": base64.b64encode(image).decode("ascii")}
+        else:
+            name = f"{random.getrandbits(64):016x}.jpg"
+            with self.files_lock:
+                self.files[name] = image
+            data = {"url": f"http://{self.headers['Host']}/files/{name}"}
+        self._send(200, json.dumps({"data": [data]}).encode("utf-8"))
+
+def start_mock_server(config: MockConfig, port: int = 0):
+    """Start the mock server on a daemon thread and return it (`server.server_port` has the port)."""
+    handler = type("ConfiguredMockAzureHandler", (MockAzureHandler,), {"config": config, "files": {}})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-azure", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the Azure OpenAI endpoints.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=MockConfig.latency)
+    parser.add_argument("--jitter", type=float, default=MockConfig.jitter)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate)
+    parser.add_argument("--image-size", type=int, default=MockConfig.image_size)
+    parser.add_argument("--audio-bytes-per-char", type=int, default=MockConfig.audio_bytes_per_char)
+    parser.add_argument("--tokens-per-word", type=float, default=MockConfig.tokens_per_word)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        image_size=args.image_size, audio_bytes_per_char=args.audio_bytes_per_char,
+        tokens_per_word=args.tokens_per_word,
+    )
+    server = start_mock_server(config, args.port)
+    print(f"🧪 Mock Azure listening on http://127.0.0.1:{server.server_port} (/chat, /images, /tts)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Pipeline benchmarks against the local mock Azure server; no real quota is used.
+
+Usage:
+    python -m benchmarks.run_benchmarks --runs 20 --concurrency 4 --latency 0.3
+
+Runs from a temporary working directory with fresh caches and artifact store, and
+reports throughput and latency percentiles for:
+    end_to_end   StoryPipeline.run (story, image, TTS) followed by the PDF download
+                 (StoryExporter.get_story_pdf), with bounded concurrency
+    pdf_<words>  StoryExporter.render_story_pdf for 250, 750 and 10,000-word stories
+    pdf_pages    pages/second laying out a 100,000-word story, against the previous
+                 line-by-line simpleSplit/drawString renderer as a baseline
+    tts_<words>  TTSGenerator.generate_speech chunking, synthesis and MP3 assembly
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.mock_azure import MockConfig, lorem, start_mock_server
+
+def summarize(name, durations, elapsed, units=None):
+    ordered = sorted(durations)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    summary = {
+        "benchmark": name,
+        "runs": len(ordered),
+        "throughput_per_s": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_s": statistics.mean(ordered),
+        "p50_s": pick(0.50),
+        "p95_s": pick(0.95),
+        "p99_s": pick(0.99),
+    }
+    if units:
+        summary.update(units)
+    return summary
+
+def run_timed(func, runs, concurrency=1):
+    """Call `func(run_index)` `runs` times and return (per-call durations, wall-clock elapsed)."""
+    def timed_call(index):
+        start = time.perf_counter()
+        func(index)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        durations = list(pool.map(timed_call, range(runs)))
+    return durations, time.perf_counter() - start
+
+def bench_end_to_end(runs, concurrency):
+    from src.pipeline import StoryPipeline
+    pipeline = StoryPipeline()
+
+    def generate(index):
+        # A distinct topic per run keeps the story cache and artifact dedupe out of the numbers
+        result = pipeline.run("Fantasy", 250, f"Benchmark forest #{index}", "Emma", "magic, forest",
+                              refresh_story=True)
+        if not result:
+            raise RuntimeError("pipeline returned no story")
+        # The pipeline no longer builds the PDF; time it as the download would, so runs stay comparable
+        pipeline.exporter.get_story_pdf(result["title"], result["story"], result["image_path"])
+
+    durations, elapsed = run_timed(generate, runs, concurrency)
+    return summarize("end_to_end", durations, elapsed)
+
+def bench_pdf(runs, word_counts, image_path):
+    from src.export_story import StoryExporter
+    exporter = StoryExporter()
+    results = []
+    for word_count in word_counts:
+        story = lorem(word_count)
+        pdf_sizes = []
+        durations, elapsed = run_timed(
+            lambda _: pdf_sizes.append(len(exporter.render_story_pdf("Benchmark", story, image_path))), runs
+        )
+        results.append(summarize(f"pdf_{word_count}", durations, elapsed,
+                                 {"pdf_bytes": statistics.mean(pdf_sizes)}))
+    return results
+
+def count_pages(pdf_bytes):
+    return len(re.findall(rb"/Type /Page\b(?!s)", pdf_bytes))
+
+def render_pdf_line_by_line(title, story):
+    """The renderer StoryExporter used before the layout engine: simpleSplit and drawString per line."""
+    from io import BytesIO
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.pdfgen import canvas
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(50, height - 50, title)
+    c.setFont("Helvetica", 12)
+    y = height - 80
+    for line in story.split("\n"):
+        for wrapped_line in simpleSplit(line, "Helvetica", 12, width - 100):
+            if y <= 50:
+                c.showPage()
+                c.setFont("Helvetica", 12)
+                y = height - 50
+            c.drawString(50, y, wrapped_line)
+            y -= 14
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+def bench_pdf_pages(runs, word_count):
+    from src.export_story import StoryExporter
+    exporter = StoryExporter()
+    story = lorem(word_count)
+    results = []
+    for name, render in (("pdf_pages", exporter.render_story_pdf), ("pdf_pages_base", render_pdf_line_by_line)):
+        page_counts = []
+        durations, elapsed = run_timed(lambda _: page_counts.append(count_pages(render("Benchmark", story))), runs)
+        pages = statistics.mean(page_counts)
+        results.append(summarize(name, durations, elapsed,
+                                 {"pages": pages, "pages_per_s": pages / statistics.mean(durations)}))
+    return results
+
+def bench_tts(runs, word_counts):
+    from src.tts_generator import TTSGenerator
+    tts = TTSGenerator()
+    results = []
+    for word_count in word_counts:
+        story = lorem(word_count)
+        # Each run varies the text so the artifact store cannot short-circuit synthesis
+        durations, elapsed = run_timed(lambda index: tts.generate_speech(f"Run {index}. {story}"), runs)
+        results.append(summarize(f"tts_{word_count}", durations, elapsed))
+    return results
+
+def print_table(results):
+    print(f"\n{'benchmark':<14}{'runs':>6}{'ops/s':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for r in results:
+        print(f"{r['benchmark']:<14}{r['runs']:>6}{r['throughput_per_s']:>9.2f}"
+              f"{r['mean_s']:>8.3f}s{r['p50_s']:>8.3f}s{r['p95_s']:>8.3f}s{r['p99_s']:>8.3f}s"
+              + (f"   {r['pages']:.0f} pages, {r['pages_per_s']:.0f} pages/s" if "pages_per_s" in r else ""))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the story pipeline against a mock Azure server.")
+    parser.add_argument("--runs", type=int, default=10, help="Iterations per benchmark")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent end-to-end generations")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock endpoint latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Mock latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock requests that fail")
+    parser.add_argument("--only", choices=["end_to_end", "pdf", "pdf_pages", "tts"], action="append",
+                        help="Run only the named benchmark group (repeatable)")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+    groups = set(args.only or ["end_to_end", "pdf", "pdf_pages", "tts"])
+
+    server = start_mock_server(MockConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate))
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    # Environment settings take precedence over secrets.toml, so real endpoints are never hit
+    os.environ.update({
+        "AZURE_OPENAI_API_ENDPOINT": f"{base_url}/chat",
+        "DALLE_API_ENDPOINT": f"{base_url}/images",
+        "AZURE_TTS_ENDPOINT": f"{base_url}/tts",
+        "AZURE_OPENAI_API_KEY": "mock",
+        "METRICS_JSON_LOGS": "false",
+    })
+    for endpoint in ("CHAT", "DALLE", "TTS"):
+        os.environ.setdefault(f"RATE_LIMIT_{endpoint}_RPS", "1000")
+        os.environ.setdefault(f"RATE_LIMIT_{endpoint}_BURST", "1000")
+        os.environ.setdefault(f"RATE_LIMIT_{endpoint}_MAX_CONCURRENCY", "64")
+
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="storyapp-bench-") as workdir:
+        os.chdir(workdir)  # Fresh story cache, library and artifact store for every run
+        results = []
+        if "end_to_end" in groups:
+            results.append(bench_end_to_end(args.runs, args.concurrency))
+        if "pdf" in groups:
+            from src.image_generator import ImageGenerator
+            image_path = ImageGenerator().generate_image("Fantasy", "Benchmark forest", "magic")
+            results.extend(bench_pdf(args.runs, [250, 750, 10000], image_path))
+        if "pdf_pages" in groups:
+            results.extend(bench_pdf_pages(max(1, args.runs // 5), 100000))
+        if "tts" in groups:
+            results.extend(bench_tts(args.runs, [750, 10000]))
+        os.chdir(original_dir)
+
+    server.shutdown()
+    print_table(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Export stories from the library as a single ZIP or EPUB bundle.
+
+Usage:
+    python export_stories.py --query dragons --limit 50 --output dragons.zip
+    python export_stories.py --ids 3 7 12 --format epub --title "Bedtime Stories" --output bedtime.epub
+    python export_stories.py --output - | ssh archive 'cat > stories.zip'
+
+Without `--ids` the newest stories (or the best `--query` matches) are exported, up to
+`--limit`. The bundle is streamed as it is built, so `--output -` writes to stdout and
+memory use does not grow with the number or size of the stories.
+"""
+import argparse
+import sys
+from src.export_bundle import BundleExporter
+from src.story_library import get_story_library
+
+def select_stories(ids, query, limit):
+    """Yield library summaries (no story text) for the chosen stories; `BundleExporter` loads the text."""
+    library = get_story_library()
+    if not ids:
+        rows, _ = library.search(query or "", page=1, page_size=limit)
+        ids = [row["id"] for row in rows]
+    for story_id in ids:
+        story = library.get_summary(story_id)
+        if story is None:
+            print(f"⚠️ Story {story_id} is not in the library, skipping", file=sys.stderr)
+            continue
+        yield story
+
+def main():
+    parser = argparse.ArgumentParser(description="Export library stories as a streaming ZIP or EPUB bundle.")
+    parser.add_argument("--ids", type=int, nargs="+", help="Library ids of the stories to export")
+    parser.add_argument("--query", help="Full-text search selecting the stories (ignored with --ids)")
+    parser.add_argument("--limit", type=int, default=100, help="Maximum stories when selecting by query or recency")
+    parser.add_argument("--format", choices=["zip", "epub"], default="zip")
+    parser.add_argument("--title", default="Story Collection", help="Book title for EPUB bundles")
+    parser.add_argument("--output", required=True, help="File to write, or - for stdout")
+    args = parser.parse_args()
+
+    exporter = BundleExporter()
+    stories = select_stories(args.ids, args.query, args.limit)
+    chunks = exporter.iter_epub(stories, args.title) if args.format == "epub" else exporter.iter_zip(stories)
+
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from src.config import get_setting
+
+def content_key(data: bytes):
+    """Key for an artifact identified by its own bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+def inputs_key(*parts):
+    """Key for an artifact identified by the inputs that produce it (e.g. TTS text and voice)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+class ArtifactStore:
+    """Content-addressed file store shared by every session.
+
+    Artifacts live at `<root>/<key[:2]>/<key[2:4]>/<key>.<ext>`, so identical audio, PDFs
+    or images produced by different sessions are stored once. Writes go to a temporary
+    file in the target directory and are renamed into place, so readers never see a
+    partially written artifact.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, key: str, ext: str):
+        return os.path.join(self.root, key[:2], key[2:4], f"{key}.{ext}")
+
+    def get(self, key: str, ext: str):
+        """Return the path of a stored artifact, or None if it is not in the store."""
+        path = self.path_for(key, ext)
+        return path if os.path.exists(path) else None
+
+    @contextmanager
+    def open_write(self, key: str, ext: str):
+        """Write an artifact through a temporary file that is atomically renamed on success.
+
+        Yields the open binary file. On error the temporary file is removed and nothing
+        becomes visible under the final path.
+        """
+        path = self.path_for(key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=f".{ext}")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                yield tmp_file
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def put_bytes(self, data: bytes, ext: str, key: str = None):
+        """Store bytes under `key` (their content hash by default) and return the path.
+
+        If the artifact already exists it is reused rather than written again.
+        """
+        key = key or content_key(data)
+        existing = self.get(key, ext)
+        if existing:
+            try:
+                os.utime(existing)  # Keep deduplicated artifacts fresh for the collector
+                return existing
+            except FileNotFoundError:
+                pass  # Evicted since the check; write it again
+        with self.open_write(key, ext) as artifact_file:
+            artifact_file.write(data)
+        return self.path_for(key, ext)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_artifact_store():
+    """Return the process-wide artifact store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore(get_setting("ARTIFACT_STORE_PATH", "artifacts"))
+    return _store
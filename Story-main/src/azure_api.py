@@ -1,27 +1,93 @@
+import json
 import requests
-import streamlit as st
+from src import http_client
+from src.config import get_setting
+
+class AzureAPIError(Exception):
+    """A chat request failed; the message says why, for showing to the user."""
 
 class AzureOpenAI:
     def __init__(self):
-        self.API_ENDPOINT = st.secrets["AZURE_OPENAI_API_ENDPOINT"]
-        self.API_KEY = st.secrets["AZURE_OPENAI_API_KEY"]
+        self.API_ENDPOINT = get_setting("AZURE_OPENAI_API_ENDPOINT")
+        self.API_KEY = get_setting("AZURE_OPENAI_API_KEY")
 
-    def generate_response(self, prompt: str, max_tokens: int = 300):
-        """Send request to Azure OpenAI API"""
+    def _build_request(self, prompt, max_tokens: int, stream: bool = False):
+        """`prompt` is either a single user message or a full list of chat messages."""
         headers = {
             "Content-Type": "application/json",
             "api-key": self.API_KEY,
         }
+        messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
         payload = {
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": messages,
             "max_tokens": max_tokens,
             "temperature": 0.7,
             "top_p": 1,
         }
+        if stream:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}  # Token usage arrives in a final chunk
+        return headers, payload
+
+    def generate_response(self, prompt: str, max_tokens: int = 300):
+        """Send request to Azure OpenAI API; returns None if it fails"""
         try:
-            response = requests.post(self.API_ENDPOINT, headers=headers, json=payload)
-            response.raise_for_status()
-            return response.json().get("choices", [{}])[0].get("message", {}).get("content", "")
-        except requests.exceptions.RequestException as e:
-            st.error(f"API Request failed: {e}")
+            return self.generate_completion(prompt, max_tokens)["content"]
+        except AzureAPIError as e:
+            print(f"⚠️ {e}")
             return None
+
+    def generate_completion(self, prompt, max_tokens: int = 300):
+        """Send a request and return {content, finish_reason, completion_tokens}.
+
+        `completion_tokens` is None when the response carries no usage information.
+        Raises `AzureAPIError` if the request fails. Generation runs on background
+        threads without a Streamlit context, so the error is raised for the caller
+        to report rather than shown here.
+        """
+        headers, payload = self._build_request(prompt, max_tokens)
+        try:
+            response = http_client.post(self.API_ENDPOINT, endpoint="chat", headers=headers, json=payload)
+            response.raise_for_status()
+            body = response.json()
+            choice = (body.get("choices") or [{}])[0]
+            return {
+                "content": choice.get("message", {}).get("content", ""),
+                "finish_reason": choice.get("finish_reason"),
+                "completion_tokens": (body.get("usage") or {}).get("completion_tokens"),
+            }
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise AzureAPIError(f"API Request failed: {e}") from e
+
+    def stream_response(self, prompt, max_tokens: int = 300):
+        """Stream the completion as server-sent events, yielding text chunks as they arrive.
+
+        The generator's return value (e.g. via `yield from`) is {finish_reason,
+        completion_tokens}. `finish_reason` is e.g. "stop" or "length", or None if the
+        stream ended without one, in which case the text yielded so far is incomplete;
+        `completion_tokens` is None if the service sent no usage chunk. Raises
+        `AzureAPIError` if the request fails or the stream breaks off.
+        """
+        finish_reason = completion_tokens = None
+        headers, payload = self._build_request(prompt, max_tokens, stream=True)
+        try:
+            with http_client.post(self.API_ENDPOINT, endpoint="chat", headers=headers, json=payload, stream=True) as response:
+                response.raise_for_status()
+                for raw_line in response.iter_lines():
+                    line = raw_line.decode("utf-8").strip() if raw_line else ""
+                    if not line.startswith("data:"):
+                        continue  # Skip keep-alives and blank event separators
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    # Azure sends content-filter results and the final usage as chunks with no choices
+                    event = json.loads(data)
+                    completion_tokens = (event.get("usage") or {}).get("completion_tokens", completion_tokens)
+                    choices = event.get("choices") or [{}]
+                    finish_reason = choices[0].get("finish_reason") or finish_reason
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise AzureAPIError(f"API Request failed: {e}") from e
+        return {"finish_reason": finish_reason, "completion_tokens": completion_tokens}
@@ -1,16 +1,102 @@
 import os
+import threading
+import time
+from src.config import get_setting
+from src.artifact_store import get_artifact_store
+from src.story_library import get_story_library
 
-def clear_directory(directory):
-    """Delete all files inside a given directory."""
-    if os.path.exists(directory):
-        for file in os.listdir(directory):
-            file_path = os.path.join(directory, file)
+_collector = None
+_collector_lock = threading.Lock()
+
+def mark_accessed(path):
+    """Bump a file's access time so the collector treats it as recently used."""
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+    except OSError:
+        pass
+
+class ArtifactCollector(threading.Thread):
+    """Background thread that evicts old artifacts and keeps total disk use under a quota.
+
+    Files untouched for longer than `ttl` seconds are deleted; if the remaining files still
+    exceed `quota_bytes`, the least recently accessed ones go first. Shard directories
+    that are empty and stale are removed afterwards.
+
+    Paths returned by `protected()` are never evicted (they still count towards the
+    quota); the app protects the illustrations and narration of library stories, which
+    cannot be regenerated.
+    """
+
+    def __init__(self, roots, ttl: float, quota_bytes: int, interval: float, protected=None):
+        super().__init__(name="artifact-collector", daemon=True)
+        self.roots = roots
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+        self.interval = interval
+        self.protected = protected
+
+    def run(self):
+        while True:
             try:
-                os.remove(file_path)  # Delete each file
+                self.collect()
             except Exception as e:
-                print(f"⚠️ Could not delete {file}: {e}")
+                print(f"⚠️ Artifact collection failed: {e}")
+            time.sleep(self.interval)
+
+    def _scan(self):
+        files = []
+        for root in self.roots:
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue  # Removed while we were scanning
+                    files.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+        return files
+
+    def collect(self):
+        """Run one eviction pass and return the number of bytes freed."""
+        now = time.time()
+        protected = {os.path.abspath(path) for path in self.protected()} if self.protected else set()
+        files = sorted(self._scan())  # Least recently used first
+        total = sum(size for _, size, _ in files)
+        freed = 0
+        for last_used, size, path in files:
+            if now - last_used < self.ttl and total - freed <= self.quota_bytes:
+                break
+            if os.path.abspath(path) in protected:
+                continue
+            try:
+                os.remove(path)
+                freed += size
+            except OSError as e:
+                print(f"⚠️ Could not delete {path}: {e}")
+
+        for root in self.roots:
+            for dirpath, _, _ in sorted(os.walk(root), reverse=True):
+                if dirpath == root:
+                    continue
+                try:
+                    # Only stale directories; a writer may be about to use a fresh one
+                    if now - os.stat(dirpath).st_mtime >= self.ttl:
+                        os.rmdir(dirpath)  # Only succeeds once the directory is empty
+                except OSError:
+                    pass
+        return freed
 
-def clear_all_temp_files():
-    """Clear all temporary files in `output_stories/` and `output_audio/`."""
-    clear_directory("output_stories")
-    clear_directory("output_audio")
+def start_artifact_collector():
+    """Start the process-wide collector once; returns immediately without scanning."""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = ArtifactCollector(
+                [get_artifact_store().root],
+                ttl=float(get_setting("ARTIFACT_TTL", 24 * 3600)),
+                quota_bytes=int(get_setting("ARTIFACT_QUOTA_BYTES", 2 * 1024 ** 3)),
+                interval=float(get_setting("ARTIFACT_GC_INTERVAL", 600)),
+                protected=get_story_library().artifact_paths,
+            )
+            _collector.start()
+    return _collector
@@ -0,0 +1,16 @@
+import os
+import streamlit as st
+
+def get_setting(name: str, default=None):
+    """Read a setting from the environment, falling back to `secrets.toml`, then `default`.
+
+    Environment variables win so a deployment (or the benchmark suite) can override
+    individual values without editing the secrets file.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        try:
+            value = st.secrets.get(name, None)
+        except Exception:
+            value = None  # No secrets file (e.g. running outside `streamlit run`)
+    return default if value is None else value
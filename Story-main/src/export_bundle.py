@@ -0,0 +1,181 @@
+import html
+import io
+import json
+import os
+import re
+import time
+import zipfile
+from src.artifact_store import inputs_key
+from src.export_story import StoryExporter
+from src.story_library import get_story_library
+
+CHUNK_SIZE = 64 * 1024
+# Already compressed formats are stored as-is; deflating them again costs CPU and saves nothing
+STORED_EXTENSIONS = {"mp3", "jpg", "jpeg", "png", "webp"}
+IMAGE_MEDIA_TYPES = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+def slugify(text: str, max_length: int = 40):
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+    return slug[:max_length].rstrip("-") or "story"
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable stream that collects what `zipfile` writes until it is drained.
+
+    Because it is not seekable, `zipfile` writes each member's sizes and CRC in a data
+    descriptor after the data instead of seeking back, so nothing has to be buffered.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+class BundleExporter:
+    """Streams many stories, with their PDFs, illustrations and narration, as one ZIP or EPUB.
+
+    Bundles are produced as a generator of byte chunks. Member files are read from the
+    artifact store `chunk_size` bytes at a time and passed straight through, so memory
+    use stays flat however many stories are included. Stories are dicts with `title`
+    and `story`, plus optional `image_path` and `audio_path` (a `StoryLibrary` record),
+    or `StoryLibrary.get_summary` dicts without `story`, whose text is then loaded
+    from the library only while that story is being written.
+    """
+
+    def __init__(self, exporter: StoryExporter = None, chunk_size: int = CHUNK_SIZE, library=None):
+        self.exporter = exporter or StoryExporter()
+        self.chunk_size = chunk_size
+        self.library = library
+
+    def _load(self, story):
+        """Return the full record for `story`, fetching its text if it is a summary (or None if gone)."""
+        if "story" in story:
+            return story
+        self.library = self.library or get_story_library()
+        return self.library.get_story(story["id"])
+
+    def _members(self, stories):
+        """Yield (archive name, source path or bytes) for every file in a ZIP bundle."""
+        manifest = []
+        for number, story in enumerate(map(self._load, stories), start=1):
+            if story is None:
+                continue
+            folder = f"{number:03d}-{slugify(story['title'])}"
+            image_path = story.get("image_path") if story.get("image_path") and os.path.exists(story["image_path"]) else None
+            files = {"story.txt": f"{story['title']}\n\n{story['story']}".encode("utf-8"),
+                     # Built on first request and reused from the store afterwards
+                     "story.pdf": self.exporter.save_story_pdf(story["title"], story["story"], image_path)}
+            if image_path:
+                files["illustration" + os.path.splitext(image_path)[1]] = image_path
+            if story.get("audio_path") and os.path.exists(story["audio_path"]):
+                files["narration.mp3"] = story["audio_path"]
+            for name, source in files.items():
+                yield f"{folder}/{name}", source
+            manifest.append({"id": story.get("id"), "title": story["title"], "folder": folder,
+                             "word_count": len(story["story"].split()), "files": sorted(files)})
+        yield "manifest.json", json.dumps(manifest, indent=2).encode("utf-8")
+
+    def _stream(self, members):
+        """Write (name, path or bytes) members into a ZIP, yielding its bytes as they are produced."""
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, "w") as archive:
+            for name, source in members:
+                extension = name.rsplit(".", 1)[-1].lower()
+                info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                info.compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS or name == "mimetype" \
+                    else zipfile.ZIP_DEFLATED
+                if isinstance(source, bytes):
+                    info.file_size = len(source)
+                    with archive.open(info, "w") as member:
+                        member.write(source)
+                    yield sink.drain()
+                    continue
+                info.file_size = os.path.getsize(source)  # Lets zipfile pick ZIP64 up front for huge files
+                with open(source, "rb") as source_file, archive.open(info, "w") as member:
+                    while chunk := source_file.read(self.chunk_size):
+                        member.write(chunk)
+                        yield sink.drain()
+                yield sink.drain()
+        yield sink.drain()  # Central directory
+
+    def iter_zip(self, stories):
+        """Yield a ZIP with one folder per story (text, PDF, illustration, narration) and a manifest."""
+        yield from filter(None, self._stream(self._members(stories)))
+
+    def _epub_members(self, stories, title: str):
+        yield "mimetype", b"application/epub+zip"  # Must come first and be stored uncompressed
+        yield "META-INF/container.xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            '</rootfiles></container>'
+        ).encode("utf-8")
+
+        # A first pass over titles and image paths only; the package document and table of
+        # contents must precede the chapters, but each chapter's text is loaded as it is written
+        chapters = []
+        for number, story in enumerate(stories, start=1):
+            if "story" in story and story.get("id") is not None:
+                story = {key: value for key, value in story.items() if key != "story"}
+            image_path = story.get("image_path") if story.get("image_path") and os.path.exists(story["image_path"]) else None
+            extension = os.path.splitext(image_path)[1].lstrip(".").lower() if image_path else None
+            if extension not in IMAGE_MEDIA_TYPES:
+                image_path = None
+            chapters.append((number, story, image_path, extension))
+
+        items = ['<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>']
+        for number, _, image_path, extension in chapters:
+            items.append(f'<item id="story{number}" href="story{number}.xhtml" media-type="application/xhtml+xml"/>')
+            if image_path:
+                items.append(f'<item id="image{number}" href="images/story{number}.{extension}" '
+                             f'media-type="{IMAGE_MEDIA_TYPES[extension]}"/>')
+        spine = "".join(f'<itemref idref="story{number}"/>' for number, *_ in chapters)
+        yield "OEBPS/content.opf", (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="bookid">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:identifier id="bookid">urn:storyapp:{inputs_key(title, [s["title"] for _, s, _, _ in chapters])}</dc:identifier>'
+            f'<dc:title>{html.escape(title)}</dc:title><dc:language>en</dc:language>'
+            f'<meta property="dcterms:modified">{time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}</meta>'
+            f'</metadata><manifest>{"".join(items)}</manifest><spine>{spine}</spine></package>'
+        ).encode("utf-8")
+
+        toc = "".join(f'<li><a href="story{number}.xhtml">{html.escape(story["title"])}</a></li>'
+                      for number, story, _, _ in chapters)
+        yield "OEBPS/nav.xhtml", self._xhtml(title, f'<nav epub:type="toc"><h1>{html.escape(title)}</h1><ol>{toc}</ol></nav>')
+
+        for number, story, image_path, extension in chapters:
+            body = [f"<h1>{html.escape(story['title'])}</h1>"]
+            if image_path:
+                body.append(f'<img src="images/story{number}.{extension}" alt="{html.escape(story["title"])}"/>')
+            text = (self._load(story) or {}).get("story", "")  # Empty if deleted since the first pass
+            body += [f"<p>{html.escape(paragraph.strip())}</p>" for paragraph in text.splitlines() if paragraph.strip()]
+            yield f"OEBPS/story{number}.xhtml", self._xhtml(story["title"], "".join(body))
+            if image_path:
+                yield f"OEBPS/images/story{number}.{extension}", image_path
+
+    @staticmethod
+    def _xhtml(title: str, body: str):
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">'
+            f"<head><title>{html.escape(title)}</title></head><body>{body}</body></html>"
+        ).encode("utf-8")
+
+    def iter_epub(self, stories, title: str = "Story Collection"):
+        """Yield an EPUB 3 book with one chapter (text and illustration) per story."""
+        yield from filter(None, self._stream(self._epub_members(stories, title)))
@@ -1,57 +1,87 @@
-import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
-from reportlab.lib.utils import simpleSplit
+from reportlab.lib.utils import ImageReader
+from src.image_store import ImageStore
+from src.image_derivatives import ImageDerivatives
+from src.artifact_store import get_artifact_store, inputs_key
+from src.config import get_setting
+from src.metrics import instrument
+from src.pdf_layout import PageWriter
 
 class StoryExporter:
-    def __init__(self):
-        self.export_dir = "output_stories"
-        os.makedirs(self.export_dir, exist_ok=True)  # Ensure directory exists
+    def __init__(self, store=None):
+        # Exports are stored by content/inputs hash, so identical stories share one file
+        self.store = store or get_artifact_store()
+        self.image_store = ImageStore(self.store)
+        self.derivatives = ImageDerivatives(self.store)
+        # Exports are built on first request; in-flight renders are shared by key
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=int(get_setting("EXPORT_WORKERS", 2)),
+                                        thread_name_prefix="story-export")
+        self.prerender = str(get_setting("PRERENDER_EXPORTS", "true")).lower() in ("1", "true", "yes")
 
-    def save_story_txt(self, title, story):
-        """Save the story as a text file."""
-        clean_title = title.strip().replace(" ", "_").replace('"', '')  # Format file name
-        file_path = os.path.join(self.export_dir, f"{clean_title}.txt")
+    def save_story_pdf(self, title, story, image_path=None):
+        """Generate a properly formatted multi-page PDF file with the story and an optional image."""
+        pdf_key = self._pdf_key(title, story, image_path)
+        existing = self.store.get(pdf_key, "pdf")
+        if existing:
+            return existing
+        return self.store.put_bytes(self.render_story_pdf(title, story, image_path), "pdf", key=pdf_key)
 
-        with open(file_path, "w", encoding="utf-8") as file:
-            file.write(f"{title}\n\n{story}")
+    def _pdf_key(self, title, story, image_path=None):
+        # The embedded image is the PDF variant, so its settings are part of the inputs
+        return inputs_key(title, story, image_path, self.derivatives.variants["pdf"])
 
-        return file_path
+    def _pdf_future(self, title, story, image_path=None):
+        """Return the future of the stored PDF's path, starting a render only if none is running."""
+        pdf_key = self._pdf_key(title, story, image_path)
+        with self._pending_lock:
+            future = self._pending.get(pdf_key)
+            if future is None:
+                future = self._pool.submit(self.save_story_pdf, title, story, image_path)
+                self._pending[pdf_key] = future
+                future.add_done_callback(lambda _: self._pending.pop(pdf_key, None))
+        return future
 
-    def save_story_pdf(self, title, story, image_url=None):
-        """Generate a properly formatted multi-page PDF file with the story and an optional image."""
-        clean_title = title.strip().replace(" ", "_").replace('"', '')
-        pdf_path = os.path.join(self.export_dir, f"{clean_title}.pdf")
+    def prerender_pdf(self, title, story, image_path=None):
+        """Start building the PDF in the background so a later download is instant (if enabled)."""
+        if self.prerender:
+            self._pdf_future(title, story, image_path)
+
+    def get_story_pdf(self, title, story, image_path=None):
+        """Return the PDF bytes, rendering and storing them on the first request only."""
+        with open(self._pdf_future(title, story, image_path).result(), "rb") as pdf_file:
+            return pdf_file.read()
+
+    @instrument("pdf", measure=len)
+    def render_story_pdf(self, title, story, image_path=None):
+        """Render the story PDF entirely in memory and return its bytes.
+
+        The stored image bytes are handed straight to reportlab, so JPEG illustrations are
+        embedded as-is instead of being decoded and re-encoded through a temporary file.
+        """
+        buffer = BytesIO()
 
         # Create a PDF canvas
-        c = canvas.Canvas(pdf_path, pagesize=letter)
+        c = canvas.Canvas(buffer, pagesize=letter)
         width, height = letter
 
-        # Function to add a new page when needed
-        def add_new_page():
-            c.showPage()
-            c.setFont("Helvetica", 12)
-            return height - 50  # Reset text position
-
         # Add title
         c.setFont("Helvetica-Bold", 16)
         c.drawString(50, height - 50, title)
 
         # Add image if available
-        if image_url:
+        if image_path:
             try:
-                from PIL import Image
-                import requests
-                from io import BytesIO
-
-                response = requests.get(image_url)
-                if response.status_code == 200:
-                    img = Image.open(BytesIO(response.content))
-                    img_path = os.path.join(self.export_dir, f"{clean_title}.jpg")
-                    img.save(img_path)
-
+                # A JPEG sized for the image box, rather than the full-resolution original
+                image_bytes = self.image_store.get(self.derivatives.pdf(image_path))
+                if image_bytes:
                     # Resize and add image at top
-                    c.drawImage(img_path, 50, height - 320, width=500, height=250, preserveAspectRatio=True, mask='auto')
+                    c.drawImage(ImageReader(BytesIO(image_bytes)), 50, height - 320, width=500, height=250, preserveAspectRatio=True, mask='auto')
                     story_y_position = height - 350  # Start story below image
                 else:
                     story_y_position = height - 80  # No image, start closer to top
@@ -61,23 +91,14 @@ class StoryExporter:
         else:
             story_y_position = height - 80  # No image, start text below title
 
-        # Story text rendering with multi-page handling
-        c.setFont("Helvetica", 12)
-        margin_x = 50
-        max_width = width - 2 * margin_x  # Text area width
-        line_spacing = 14  # Line height
-
-        for line in story.split("\n"):
-            wrapped_lines = simpleSplit(line, "Helvetica", 12, max_width)
-
-            for wrapped_line in wrapped_lines:
-                if story_y_position <= 50:  # Check if we need a new page
-                    story_y_position = add_new_page()
-                
-                c.drawString(margin_x, story_y_position, wrapped_line)
-                story_y_position -= line_spacing  # Move to next line
+        # Story text: paragraphs are broken into lines with cached glyph widths, one text object per page
+        writer = PageWriter(c, width, height, header=title)
+        writer.start(story_y_position)
+        for paragraph in story.splitlines():
+            if paragraph.strip():
+                writer.paragraph(paragraph.strip())
+        writer.finish()
 
         # Save PDF
-        c.showPage()
         c.save()
-        return pdf_path
+        return buffer.getvalue()
@@ -0,0 +1,194 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+import requests
+from requests.adapters import HTTPAdapter
+from src.config import get_setting
+from src.rate_limiter import get_limiter
+from src.metrics import get_metrics
+
+# Overall time budget per endpoint, across all retries (seconds)
+DEFAULT_DEADLINES = {"chat": 180, "dalle": 120, "tts": 90}
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_hedge_pool = None
+
+def get_timeout():
+    """Return the (connect, read) timeout tuple used for every Azure request."""
+    connect_timeout = float(get_setting("HTTP_CONNECT_TIMEOUT", 5))
+    read_timeout = float(get_setting("HTTP_READ_TIMEOUT", 120))
+    return connect_timeout, read_timeout
+
+def get_session():
+    """Return the process-wide `requests.Session` with a keep-alive connection pool.
+
+    The session is shared by every client and every Streamlit session, so DNS lookups
+    and TCP/TLS handshakes are paid once per host instead of once per request.
+    """
+    global _session, _hedge_pool
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = int(get_setting("HTTP_POOL_SIZE", 10))
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _hedge_pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="hedge")
+                _session = session
+    return _session
+
+def backoff_delay(attempt: int):
+    """Exponential backoff with full jitter for the given (zero-based) retry attempt."""
+    base = float(get_setting("HTTP_BACKOFF_BASE", 0.5))
+    cap = float(get_setting("HTTP_BACKOFF_CAP", 10))
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class LatencyTracker:
+    """Rolling window of recent successful request latencies for one endpoint."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, fraction: float):
+        """Return the latency at `fraction` (e.g. 0.95), or None until enough samples exist."""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+_latencies = {name: LatencyTracker() for name in DEFAULT_DEADLINES}
+
+def _release_on_close(response, limiter):
+    """Hold a streamed response's limiter slot until the response is closed.
+
+    The body of a streamed chat completion keeps arriving long after the headers, so the
+    slot is freed by `response.close()` (also called when a `with` block exits).
+    """
+    close = response.close
+    released = threading.Event()
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            if not released.is_set():
+                released.set()
+                limiter.release(response)
+
+    response.close = close_and_release
+
+def _send(endpoint, url, kwargs, deadline):
+    """Send one POST through the endpoint's rate limiter and record its latency.
+
+    Raises `Timeout` if no limiter slot frees up before `deadline` (a `time.monotonic()` value).
+    """
+    limiter = get_limiter(endpoint)
+    if not limiter.acquire(timeout=deadline - time.monotonic()):
+        raise requests.exceptions.Timeout(f"{endpoint} request exceeded its deadline waiting for the rate limiter")
+    start = time.monotonic()
+    try:
+        response = get_session().post(url, **kwargs)
+    except requests.exceptions.RequestException:
+        limiter.release()
+        raise
+    if kwargs.get("stream"):
+        _release_on_close(response, limiter)
+    else:
+        limiter.release(response)
+    if response.ok:
+        _latencies[endpoint].record(time.monotonic() - start)
+    return response
+
+def _discard(future):
+    if not future.exception():
+        future.result().close()
+
+def _hedged_send(endpoint, url, kwargs, deadline):
+    """Send a request, and a second copy if the first outlives the endpoint's p95 latency.
+
+    Whichever copy answers first wins; the other is closed once it completes.
+    """
+    hedge_after = _latencies[endpoint].percentile(0.95)
+    if hedge_after is None:
+        return _send(endpoint, url, kwargs, deadline)
+
+    get_session()  # Ensures the hedge pool exists
+    first = _hedge_pool.submit(_send, endpoint, url, kwargs, deadline)
+    try:
+        return first.result(timeout=hedge_after)
+    except FutureTimeout:
+        pass
+
+    get_metrics().increment("hedged_requests", endpoint)
+    second = _hedge_pool.submit(_send, endpoint, url, kwargs, deadline)
+    done, _ = wait([first, second], return_when=FIRST_COMPLETED)
+    winner = done.pop()
+    loser = second if winner is first else first
+    if winner.exception():
+        return loser.result()  # The straggler is now the only candidate
+    loser.add_done_callback(_discard)
+    return winner.result()
+
+def post(url, endpoint=None, **kwargs):
+    """POST through the shared session, applying the default timeouts.
+
+    With `endpoint` (`chat`, `dalle` or `tts`) the request goes through that endpoint's
+    shared rate limiter and runs under a per-endpoint deadline (`DEADLINE_<ENDPOINT>`).
+    Connection errors, timeouts and retryable statuses are retried with jittered
+    exponential backoff until the deadline; 429s wait for the server's `Retry-After`.
+    Endpoints listed in `HEDGE_ENDPOINTS` also send a hedged duplicate when a
+    non-streaming request runs past that endpoint's p95 latency.
+    """
+    if endpoint is None:
+        kwargs.setdefault("timeout", get_timeout())
+        return get_session().post(url, **kwargs)
+
+    connect_timeout, read_timeout = kwargs.pop("timeout", None) or get_timeout()
+    deadline = time.monotonic() + float(get_setting(f"DEADLINE_{endpoint.upper()}", DEFAULT_DEADLINES[endpoint]))
+    max_retries = int(get_setting("HTTP_MAX_RETRIES", 3))
+    hedged_endpoints = {name.strip() for name in str(get_setting("HEDGE_ENDPOINTS", "")).split(",")}
+    send = _hedged_send if endpoint in hedged_endpoints and not kwargs.get("stream") else _send
+
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.exceptions.Timeout(f"{endpoint} request exceeded its deadline")
+        kwargs["timeout"] = (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+        try:
+            response = send(endpoint, url, kwargs, deadline)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= max_retries:
+                raise
+            response = None
+
+        if response is not None and (response.status_code not in RETRYABLE_STATUS or attempt >= max_retries):
+            return response
+
+        get_metrics().increment("http_retries", endpoint)
+        if response is not None:
+            if response.status_code == 429:
+                get_metrics().increment("rate_limited", endpoint)
+            response.close()
+        if response is None or response.status_code != 429:
+            # 429s are already paused by the limiter for Retry-After
+            time.sleep(min(backoff_delay(attempt), max(0.0, deadline - time.monotonic())))
+        attempt += 1
+
+def get(url, **kwargs):
+    """GET through the shared session, applying the default timeouts."""
+    kwargs.setdefault("timeout", get_timeout())
+    return get_session().get(url, **kwargs)
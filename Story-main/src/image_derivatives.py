@@ -0,0 +1,93 @@
+import os
+from io import BytesIO
+from PIL import Image
+from src.artifact_store import get_artifact_store, inputs_key
+from src.config import get_setting
+from src.metrics import get_metrics
+
+PDF_IMAGE_BOX = (500, 250)  # Points; the box StoryExporter draws the illustration into
+
+class ImageDerivatives:
+    """Smaller copies of stored illustrations for display and for PDF embedding.
+
+    Variants are keyed by the source image's content hash and the variant settings, so
+    each one is encoded once and shared by every session. `prepare` makes every variant
+    for a story's illustration and reports the bytes each one saves against it.
+
+    Variants:
+        display  WebP (or JPEG) no larger than `IMAGE_DISPLAY_MAX_EDGE` pixels
+        pdf      JPEG sized for the PDF image box at `IMAGE_PDF_DPI`; reportlab embeds
+                 JPEG data as-is, so it is not re-encoded again when the PDF is built
+    """
+
+    def __init__(self, store=None):
+        self.store = store or get_artifact_store()
+        display_edge = int(get_setting("IMAGE_DISPLAY_MAX_EDGE", 768))
+        pdf_scale = float(get_setting("IMAGE_PDF_DPI", 150)) / 72
+        self.variants = {
+            "display": {
+                "format": str(get_setting("IMAGE_DISPLAY_FORMAT", "webp")).lower(),
+                "size": (display_edge, display_edge),
+                "quality": int(get_setting("IMAGE_DISPLAY_QUALITY", 80)),
+            },
+            "pdf": {
+                "format": "jpeg",
+                "size": (round(PDF_IMAGE_BOX[0] * pdf_scale), round(PDF_IMAGE_BOX[1] * pdf_scale)),
+                "quality": int(get_setting("IMAGE_PDF_QUALITY", 80)),
+            },
+        }
+
+    @staticmethod
+    def _encode(image: Image.Image, size, image_format: str, quality: int):
+        image = image.copy()
+        image.thumbnail(size, Image.LANCZOS)  # Keeps the aspect ratio and never upscales
+        if image_format == "jpeg" and image.mode != "RGB":
+            # JPEG has no alpha channel; flatten transparency onto white like the page behind it
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, "white")
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        buffer = BytesIO()
+        image.save(buffer, image_format.upper(), quality=quality, optimize=image_format == "jpeg")
+        return buffer.getvalue()
+
+    def variant(self, image_path: str, name: str):
+        """Return the path of the `name` variant of a stored image, creating it on first use.
+
+        Falls back to the original path if the image cannot be read or encoded.
+        """
+        settings = self.variants[name]
+        extension = "jpg" if settings["format"] == "jpeg" else settings["format"]
+        source_key = os.path.splitext(os.path.basename(image_path))[0]  # Stored images are named by content hash
+        key = inputs_key(source_key, name, settings)
+        existing = self.store.get(key, extension)
+        if existing:
+            return existing
+
+        try:
+            with get_metrics().span("image_derivative", variant=name) as span:
+                with Image.open(image_path) as image:
+                    data = self._encode(image, settings["size"], settings["format"], settings["quality"])
+                span.add_bytes(len(data))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not create {name} image for {image_path}: {e}")
+            return image_path
+        return self.store.put_bytes(data, extension, key=key)
+
+    def prepare(self, image_path: str):
+        """Create (or reuse) every variant of a story's illustration.
+
+        Returns {variant: bytes saved against the original} and adds the same amounts to the
+        `image_bytes_saved` counter, so savings are counted per story, cached variants included.
+        """
+        saved = {}
+        source_bytes = os.path.getsize(image_path)
+        for name in self.variants:
+            saved[name] = max(0, source_bytes - os.path.getsize(self.variant(image_path, name)))
+            get_metrics().increment("image_bytes_saved", name, saved[name], label_name="variant")
+        return saved
+
+    def display(self, image_path: str):
+        return self.variant(image_path, "display")
+
+    def pdf(self, image_path: str):
+        return self.variant(image_path, "pdf")
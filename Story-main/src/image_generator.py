@@ -1,14 +1,23 @@
+import base64
 import requests
-import streamlit as st
-import time
+from src import http_client
+from src.config import get_setting
+from src.image_store import ImageStore
+from src.metrics import file_size, get_metrics, instrument
 
 class ImageGenerator:
     def __init__(self):
-        self.DALLE_API_ENDPOINT = st.secrets.get("DALLE_API_ENDPOINT", None)
-        self.API_KEY = st.secrets.get("AZURE_OPENAI_API_KEY", None)
+        self.DALLE_API_ENDPOINT = get_setting("DALLE_API_ENDPOINT")
+        self.API_KEY = get_setting("AZURE_OPENAI_API_KEY")
+        self.image_store = ImageStore()
 
+    @instrument("image", measure=file_size)
     def generate_image(self, genre: str, topic: str, keywords: str):
-        """Generate an image using DALL·E with error handling and retry mechanism."""
+        """Generate an image using DALL·E; retries happen in `http_client.post`.
+
+        Returns:
+            str: Local path of the stored image, or None if generation failed
+        """
         if not self.DALLE_API_ENDPOINT or not self.API_KEY:
             print("⚠️ Warning: Missing Azure DALL·E API credentials.")
             return None
@@ -27,16 +36,24 @@ class ImageGenerator:
         payload = {
             "prompt": prompt,
             "model": "dall-e-3",
-            "size": "1024x1024"
+            "size": "1024x1024",
+            "response_format": "b64_json"  # Image bytes inline, no expiring URL to fetch later
         }
 
-        for attempt in range(2):  # Retry once if first attempt fails
-            try:
-                response = requests.post(self.DALLE_API_ENDPOINT, headers=headers, json=payload)
-                response.raise_for_status()
-                return response.json().get("data", [{}])[0].get("url")
-            except requests.exceptions.HTTPError as e:
-                print(f"⚠️ DALL·E Error (Attempt {attempt+1}): {e}")
-                time.sleep(1)  # Short delay before retrying
-
-        return None  # Return None if all attempts fail
+        try:
+            response = http_client.post(self.DALLE_API_ENDPOINT, endpoint="dalle", headers=headers, json=payload)
+            response.raise_for_status()
+            image_data = response.json().get("data", [{}])[0]
+            if image_data.get("b64_json"):
+                return self.image_store.put(base64.b64decode(image_data["b64_json"]))
+            if image_data.get("url"):
+                # Deployments that ignore `response_format` still return a URL; download it once
+                with get_metrics().span("image_fetch") as span:
+                    image_response = http_client.get(image_data["url"])
+                    image_response.raise_for_status()
+                    span.add_bytes(len(image_response.content))
+                return self.image_store.put(image_response.content)
+            return None
+        except (requests.exceptions.RequestException, ValueError) as e:  # ValueError covers bad JSON and base64
+            print(f"⚠️ DALL·E Error: {e}")
+            return None
@@ -0,0 +1,33 @@
+from src.artifact_store import get_artifact_store
+
+def detect_image_extension(image_bytes: bytes):
+    """Guess the file extension of an image from its magic bytes."""
+    if image_bytes.startswith(b"\x89PNG"):
+        return "png"
+    if image_bytes.startswith(b"\xff\xd8"):
+        return "jpg"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "webp"
+    return "bin"
+
+class ImageStore:
+    """Keeps generated images in the artifact store under their content hash.
+
+    DALL·E URLs expire and are large, so each image is fetched once and the stored
+    bytes are served to both the story view and the PDF exporter.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or get_artifact_store()
+
+    def put(self, image_bytes: bytes):
+        """Store image bytes and return the local file path (idempotent for identical content)."""
+        return self.store.put_bytes(image_bytes, detect_image_extension(image_bytes))
+
+    def get(self, image_path: str):
+        """Return the stored bytes for an image path, or None if it is gone."""
+        try:
+            with open(image_path, "rb") as image_file:
+                return image_file.read()
+        except OSError:
+            return None
@@ -0,0 +1,116 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src.config import get_setting
+from src.pipeline import StoryPipeline, get_pipeline
+
+# Stages shown in the progress view, in pipeline order
+JOB_STAGES = ("story", "image", "speech")
+
+_manager = None
+_manager_lock = threading.Lock()
+
+class Job:
+    """Progress and outcome of one background generation.
+
+    Fields are written by the worker thread and read by any session polling the job.
+    """
+
+    def __init__(self, job_id: str, params: dict):
+        self.id = job_id
+        self.params = params
+        self.status = "queued"  # queued, running, done, failed
+        self.stages = {stage: "pending" for stage in JOB_STAGES}
+        self.partial_story = ""
+        self.audio_preview = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+class JobManager:
+    """Runs story generations on a worker pool, independently of any Streamlit session.
+
+    A job keeps running if the page reruns, is refreshed or loses its websocket; whoever
+    holds the job id can poll its progress and pick up the result. Finished jobs are
+    kept for `retention` seconds.
+    """
+
+    def __init__(self, pipeline: StoryPipeline, max_workers: int, retention: float):
+        self.pipeline = pipeline
+        self.retention = retention
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="story-job")
+
+    def submit(self, genre: str, length: int, topic: str, character_name: str, keywords: str, **options):
+        """Queue a generation and return its job id; `options` are passed to `StoryPipeline.run`."""
+        params = {"genre": genre, "length": length, "topic": topic,
+                  "character_name": character_name, "keywords": keywords, **options}
+        job = Job(uuid.uuid4().hex, params)
+        with self._lock:
+            self._prune()
+            self.jobs[job.id] = job
+        if not options.get("generate_image", True):
+            job.stages.pop("image")
+        if not options.get("generate_speech", True):
+            job.stages.pop("speech")
+        self._pool.submit(self._run, job)
+        return job.id
+
+    def get(self, job_id: str):
+        """Return the job with this id, or None if it is unknown or has expired."""
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job: Job):
+        job.status = "running"
+
+        def on_stage(stage, status):
+            if stage in job.stages:
+                job.stages[stage] = status
+
+        def on_story_chunk(text):
+            job.partial_story = text
+
+        def on_audio_preview(path):
+            job.audio_preview = path
+
+        try:
+            job.result = self.pipeline.run(
+                **job.params, on_story_chunk=on_story_chunk,
+                on_audio_preview=on_audio_preview, on_stage=on_stage
+            )
+            if not job.result:
+                job.error = "Story generation failed."
+        except Exception as e:
+            # Workers have no Streamlit context; the session polling the job shows the reason
+            print(f"⚠️ Job {job.id} failed: {e}")
+            job.error = str(e)
+        job.status = "done" if job.result else "failed"
+        job.finished_at = time.time()
+
+    def _prune(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.finished and now - job.finished_at > self.retention]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+def get_job_manager():
+    """Return the process-wide job manager."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager(
+                    get_pipeline(),
+                    max_workers=int(get_setting("JOB_WORKERS", 4)),
+                    retention=float(get_setting("JOB_RETENTION", 3600)),
+                )
+    return _manager
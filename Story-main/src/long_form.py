@@ -0,0 +1,162 @@
+import json
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from src.azure_api import AzureAPIError
+from src.config import get_setting
+from src.metrics import get_metrics
+
+# Strips a ```json fence the model sometimes wraps around the outline
+CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+class LongFormWriter:
+    """Writes book-length stories as an outline, concurrently drafted chapters and a stitching pass.
+
+    Every chapter is drafted from the same brief (characters, setting, tone) and the full
+    outline, so the drafts can run in parallel and latency tracks chapter length rather
+    than book length. The stitching pass only rewrites the opening of each chapter
+    against the end of the one before it, so it is parallel too.
+    """
+
+    def __init__(self, story_gen):
+        self.story_gen = story_gen
+        self.azure_api = story_gen.azure_api
+        self.chapter_words = int(get_setting("LONG_FORM_CHAPTER_WORDS", 1500))
+        self.max_workers = int(get_setting("LONG_FORM_WORKERS", 4))
+
+    def _outline_prompt(self, genre: str, length: int, topic: str, character_name: str, keywords: str,
+                        chapter_count: int):
+        return (
+            f"Plan a **{genre}** story of about {length} words in exactly {chapter_count} chapters.\n\n"
+            f"- **Main Topic:** {topic}\n"
+            f"- **Main Character:** {character_name}\n"
+            f"- **Keywords:** {keywords}\n\n"
+            f"Reply with JSON only, in this form:\n"
+            f'{{"title": "<5-8 word title>", '
+            f'"brief": "<the main characters with names and traits, the setting, and the tone and point of view>", '
+            f'"chapters": [{{"title": "<chapter title>", "summary": "<what happens, 2-3 sentences>"}}]}}\n\n'
+            f"The chapters must build to a satisfying ending in the last chapter."
+        )
+
+    def _chapter_prompt(self, genre: str, outline: dict, index: int, words: int):
+        chapters = outline["chapters"]
+        plan = "\n".join(f"{number}. {chapter['title']}: {chapter['summary']}"
+                         for number, chapter in enumerate(chapters, start=1))
+        position = "the final chapter; resolve the story" if index == len(chapters) - 1 else "not the last chapter"
+        return (
+            f"You are writing chapter {index + 1} of the {genre} story \"{outline['title']}\".\n\n"
+            f"**Story brief:** {outline['brief']}\n\n"
+            f"**Chapter plan:**\n{plan}\n\n"
+            f"Write chapter {index + 1} (\"{chapters[index]['title']}\") in approximately {words} words. "
+            f"It is {position}. Stay consistent with the brief and only cover the events planned for "
+            f"this chapter. Use vivid descriptions and dialogue. Reply with the chapter prose only, "
+            f"without a chapter heading."
+        )
+
+    @staticmethod
+    def _parse_outline(text: str, chapter_count: int):
+        """Return the outline dict, or None if the reply is not usable."""
+        try:
+            outline = json.loads(CODE_FENCE.sub("", (text or "").strip()))
+            chapters = [{"title": str(chapter["title"]).strip(), "summary": str(chapter["summary"]).strip()}
+                        for chapter in outline["chapters"]]
+            title, brief = str(outline["title"]).strip(), str(outline["brief"]).strip()
+        except (ValueError, KeyError, TypeError):
+            return None
+        if not chapters or not title:
+            return None
+        return {"title": title, "brief": brief, "chapters": chapters[:chapter_count]}
+
+    def outline(self, genre: str, length: int, topic: str, character_name: str, keywords: str):
+        chapter_count = max(2, math.ceil(length / self.chapter_words))
+        prompt = self._outline_prompt(genre, length, topic, character_name, keywords, chapter_count)
+        with get_metrics().span("outline") as span:
+            completion = self.azure_api.generate_completion(prompt, max_tokens=120 + 120 * chapter_count)
+            outline = self._parse_outline(completion["content"], chapter_count)
+            if outline is None:
+                span.fail()
+        return outline
+
+    def write_chapter(self, genre: str, outline: dict, index: int, words: int, usage: dict = None):
+        with get_metrics().span("chapter", chapter=index + 1) as span:
+            text = self.story_gen.complete(self._chapter_prompt(genre, outline, index, words), words, usage).strip()
+            span.add_bytes(len(text.encode("utf-8")))
+            if not text:
+                span.fail()
+        return text
+
+    def stitch(self, previous: str, chapter: str):
+        """Rewrite the opening paragraph of `chapter` so it follows on from the end of `previous`.
+
+        Returns the chapter unchanged if the rewrite fails or looks wrong.
+        """
+        paragraphs = chapter.split("\n\n")
+        opening = paragraphs[0]
+        prompt = (
+            f"Here is the end of one chapter of a story:\n\n{previous[-1500:]}\n\n"
+            f"Here is the opening paragraph of the next chapter:\n\n{opening}\n\n"
+            f"Revise the opening paragraph so it follows on smoothly: fix any contradictions in "
+            f"names, places or events and avoid repeating what was just said. Keep its events, "
+            f"length and style. Reply with the revised paragraph only."
+        )
+        with get_metrics().span("stitch") as span:
+            try:
+                completion = self.azure_api.generate_completion(prompt, max_tokens=len(opening.split()) * 2 + 50)
+            except AzureAPIError as e:
+                print(f"⚠️ Stitching skipped: {e}")
+                span.fail()
+                return chapter
+            revised = (completion["content"] or "").strip()
+            # A much shorter or longer reply is more likely a refusal or a ramble than a revision
+            if not 0.5 <= len(revised) / max(1, len(opening)) <= 2:
+                span.fail()
+                return chapter
+        return "\n\n".join([revised] + paragraphs[1:])
+
+    def write(self, genre: str, length: int, topic: str, character_name: str, keywords: str, on_chunk=None,
+              usage: dict = None):
+        """Write a long-form story and return it as `Title: <title>` followed by the chapters.
+
+        `on_chunk(text_so_far)` is called each time the next chapter in reading order is drafted.
+        Chapter tokens are added to `usage` as in `StoryGenerator.complete`.
+        Returns an empty string if the outline or a chapter is unusable, and raises
+        `AzureAPIError` if one of their requests fails.
+        """
+        outline = self.outline(genre, length, topic, character_name, keywords)
+        if outline is None:
+            return ""
+        chapters = outline["chapters"]
+        words = math.ceil(length / len(chapters))
+
+        drafts = [None] * len(chapters)
+        chapter_usage = [{} for _ in chapters]  # One per worker thread, summed below
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self.write_chapter, genre, outline, index, words, chapter_usage[index])
+                       for index in range(len(chapters))]
+            for index, future in enumerate(futures):
+                try:
+                    drafts[index] = future.result()
+                except AzureAPIError:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+                if not drafts[index]:
+                    # The book is lost anyway; don't wait for (and pay for) chapters not yet started
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    return ""
+                if on_chunk:
+                    on_chunk(self._join(chapters, drafts[:index + 1]))
+
+            stitched = pool.map(self.stitch, drafts[:-1], drafts[1:])
+            drafts = drafts[:1] + list(stitched)
+
+        if usage is not None:
+            for counts in chapter_usage:
+                for name, count in counts.items():
+                    usage[name] = usage.get(name, 0) + count
+
+        return f"Title: {outline['title']}\n\n{self._join(chapters, drafts)}"
+
+    @staticmethod
+    def _join(chapters: list, drafts: list):
+        return "\n\n".join(f"Chapter {number}: {chapter['title']}\n\n{draft}"
+                           for number, (chapter, draft) in enumerate(zip(chapters, drafts), start=1))
@@ -0,0 +1,204 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.config import get_setting
+
+# Histogram bucket upper bounds in seconds, Prometheus style
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+class StageStats:
+    """Latency histogram, recent samples, byte and error counts for one pipeline stage."""
+
+    def __init__(self, window: int = 1000):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.errors = 0
+        self.bytes = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds: float, byte_count: int, error: bool):
+        self.count += 1
+        self.total_seconds += seconds
+        self.bytes += byte_count
+        self.errors += int(error)
+        self.recent.append(seconds)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+
+class Span:
+    """Handle yielded by `MetricsRegistry.span` to attach bytes or mark a soft failure."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.error = False
+
+    def add_bytes(self, byte_count: int):
+        self.bytes += byte_count
+
+    def fail(self):
+        self.error = True
+
+class MetricsRegistry:
+    """Process-wide per-stage latency, byte, retry and error metrics."""
+
+    def __init__(self, json_logs: bool):
+        self.json_logs = json_logs
+        self.stages = defaultdict(StageStats)
+        self.counters = defaultdict(int)  # (name, label_name, label) -> value
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str, **fields):
+        """Time a block of work as one observation of `stage`.
+
+        An exception, or a call to `span.fail()`, counts the observation as an error.
+        """
+        span = Span()
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.fail()
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, span.bytes, span.error, **fields)
+
+    def observe(self, stage: str, seconds: float, byte_count: int = 0, error: bool = False, **fields):
+        with self._lock:
+            self.stages[stage].observe(seconds, byte_count, error)
+        if self.json_logs:
+            print(json.dumps({
+                "event": "stage", "stage": stage, "seconds": round(seconds, 4),
+                "bytes": byte_count, "error": error, "ts": time.time(), **fields,
+            }), flush=True)
+
+    def increment(self, name: str, label: str, value: int = 1, label_name: str = "endpoint"):
+        """Increment a labelled counter, e.g. `increment("http_retries", "chat")`."""
+        with self._lock:
+            self.counters[(name, label_name, label)] += value
+
+    def percentiles(self):
+        """Return {stage: {count, p50, p95, p99, error_rate, bytes}} from the recent window."""
+        summary = {}
+        with self._lock:
+            for stage, stats in self.stages.items():
+                ordered = sorted(stats.recent)
+                if not ordered:
+                    continue
+                pick = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+                summary[stage] = {
+                    "count": stats.count,
+                    "p50": pick(0.50),
+                    "p95": pick(0.95),
+                    "p99": pick(0.99),
+                    "error_rate": stats.errors / stats.count,
+                    "bytes": stats.bytes,
+                }
+        return summary
+
+    def prometheus_text(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP storyapp_stage_latency_seconds Latency of pipeline stages.",
+            "# TYPE storyapp_stage_latency_seconds histogram",
+        ]
+        with self._lock:
+            for stage, stats in sorted(self.stages.items()):
+                for bound, bucket_count in zip(LATENCY_BUCKETS, stats.bucket_counts):
+                    lines.append(f'storyapp_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {bucket_count}')
+                lines.append(f'storyapp_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {stats.count}')
+                lines.append(f'storyapp_stage_latency_seconds_sum{{stage="{stage}"}} {stats.total_seconds}')
+                lines.append(f'storyapp_stage_latency_seconds_count{{stage="{stage}"}} {stats.count}')
+
+            lines += ["# HELP storyapp_stage_errors_total Failed stage executions.",
+                      "# TYPE storyapp_stage_errors_total counter"]
+            lines += [f'storyapp_stage_errors_total{{stage="{stage}"}} {stats.errors}'
+                      for stage, stats in sorted(self.stages.items())]
+
+            lines += ["# HELP storyapp_stage_bytes_total Bytes transferred or produced by each stage.",
+                      "# TYPE storyapp_stage_bytes_total counter"]
+            lines += [f'storyapp_stage_bytes_total{{stage="{stage}"}} {stats.bytes}'
+                      for stage, stats in sorted(self.stages.items())]
+
+            for name in sorted({name for name, _, _ in self.counters}):
+                lines += [f"# TYPE storyapp_{name}_total counter"]
+                lines += [f'storyapp_{name}_total{{{label_name}="{label}"}} {value}'
+                          for (counter, label_name, label), value in sorted(self.counters.items()) if counter == name]
+        return "\n".join(lines) + "\n"
+
+def instrument(stage: str, measure=None, failed=None):
+    """Decorator that records each call as one observation of `stage`.
+
+    Args:
+        measure (callable): Optional; maps the return value to a byte count
+        failed (callable): Optional; maps the return value to True for a soft failure
+            (defaults to the call returning None)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_metrics().span(stage) as span:
+                result = func(*args, **kwargs)
+                if (failed(result) if failed else result is None):
+                    span.fail()
+                elif measure:
+                    span.add_bytes(measure(result))
+                return result
+        return wrapper
+    return decorator
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
+
+_registry = None
+_registry_lock = threading.Lock()
+_server = None
+
+def get_metrics():
+    """Return the process-wide metrics registry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                json_logs = str(get_setting("METRICS_JSON_LOGS", "true")).lower() in ("1", "true", "yes")
+                _registry = MetricsRegistry(json_logs=json_logs)
+    return _registry
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the app log
+
+def start_metrics_server():
+    """Serve `/metrics` on `METRICS_PORT` from a daemon thread, once per process (no-op if unset)."""
+    global _server
+    port = get_setting("METRICS_PORT", None)
+    with _registry_lock:
+        if _server is None and port:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+            except OSError as e:
+                print(f"⚠️ Could not start metrics server on port {port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
@@ -0,0 +1,194 @@
+import functools
+import re
+from reportlab.pdfbase import pdfmetrics
+
+# A paragraph on its own like "Chapter 3: The Silver River" (long-form stories) is set as a heading
+CHAPTER_HEADING = re.compile(r"^chapter \d+\b.{0,120}$", re.IGNORECASE)
+MIN_HYPHEN_FRAGMENT = 3  # Letters kept on either side of a hyphenation point
+SOFT_HYPHEN = "\u00ad"
+# URLs, e-mail addresses and numbers are never hyphenated
+NO_HYPHENATION = re.compile(r"://|^www\.|@|\d")
+
+class FontMetrics:
+    """Glyph and word widths for one font at one size, measured once and then looked up.
+
+    Widths come from the font's own table via `pdfmetrics`, so lines measure exactly as
+    reportlab draws them; repeated words cost a single dict lookup.
+    """
+
+    def __init__(self, font_name: str, size: float, max_words: int = 50000):
+        self.font_name = font_name
+        self.size = size
+        self.max_words = max_words
+        self.char_widths = {}
+        self.word_widths = {}
+        self.space_width = self.char_width(" ")
+        self.hyphen_width = self.char_width("-")
+
+    def char_width(self, char: str):
+        width = self.char_widths.get(char)
+        if width is None:
+            width = self.char_widths[char] = pdfmetrics.stringWidth(char, self.font_name, self.size)
+        return width
+
+    def word_width(self, word: str):
+        width = self.word_widths.get(word)
+        if width is None:
+            width = sum(self.char_width(char) for char in word)
+            if len(self.word_widths) >= self.max_words:
+                self.word_widths.clear()  # Keep memory bounded on huge vocabularies
+            self.word_widths[word] = width
+        return width
+
+@functools.lru_cache(maxsize=None)
+def get_font_metrics(font_name: str, size: float):
+    """Return the shared width table for a font and size."""
+    return FontMetrics(font_name, size)
+
+def _visible(word: str):
+    return word.replace(SOFT_HYPHEN, "")
+
+def _split_word(word: str, metrics: FontMetrics, available: float):
+    """Split `word` at a hyphen or soft hyphen it already contains, into a head that fits
+    `available` points (ending in "-") and the remaining tail.
+
+    Words are only broken where their text allows it, with at least `MIN_HYPHEN_FRAGMENT`
+    letters on either side; URLs, e-mail addresses and words with digits are never split.
+    Returns (None, word) if there is no such break.
+    """
+    if NO_HYPHENATION.search(word):
+        return None, word
+    best = None
+    for index, char in enumerate(word):
+        if char != "-" and char != SOFT_HYPHEN:
+            continue
+        head, tail = _visible(word[:index]) + "-", word[index + 1:]
+        if sum(c.isalpha() for c in head) < MIN_HYPHEN_FRAGMENT or sum(c.isalpha() for c in tail) < MIN_HYPHEN_FRAGMENT:
+            continue
+        if metrics.word_width(head) > available:
+            break  # Later breaks only make the head wider
+        best = head, tail
+    return best or (None, word)
+
+def _cut_word(word: str, metrics: FontMetrics, max_width: float):
+    """Cut a word wider than a whole line (a long URL, say) where the line ends, without a hyphen."""
+    word = _visible(word)
+    width = 0.0
+    cut = 0
+    for index, char in enumerate(word):
+        width += metrics.char_width(char)
+        if width > max_width:
+            break
+        cut = index + 1
+    cut = max(cut, 1)  # A single glyph wider than the line still has to go somewhere
+    return word[:cut], word[cut:]
+
+def break_lines(paragraph: str, metrics: FontMetrics, max_width: float):
+    """Greedy line breaking: fill each line with as many words as fit.
+
+    A word that does not fit is broken at one of its own hyphens or soft hyphens when the
+    current line would otherwise be left less than three-quarters full. A word wider than
+    a whole line with no such break is cut where the line ends. Soft hyphens are only
+    shown at a line break.
+    """
+    lines = []
+    line_words = []
+    line_width = 0.0
+    for word in paragraph.split():
+        word_width = metrics.word_width(_visible(word))
+        while word:
+            space = metrics.space_width if line_words else 0
+            if line_width + space + word_width <= max_width:
+                line_words.append(_visible(word))
+                line_width += space + word_width
+                break
+            if line_width < 0.75 * max_width:
+                head, tail = _split_word(word, metrics, max_width - line_width - space)
+                if head:
+                    line_words.append(head)
+                    word, word_width = tail, metrics.word_width(_visible(tail))
+            if not line_words:
+                head, word = _cut_word(word, metrics, max_width)
+                line_words.append(head)
+                word_width = metrics.word_width(word)
+            lines.append(" ".join(line_words))
+            line_words, line_width = [], 0.0
+    if line_words:
+        lines.append(" ".join(line_words))
+    return lines
+
+class PageWriter:
+    """Lays out paragraphs onto canvas pages, starting a new page as each one fills.
+
+    Each page's lines are written through a single text object rather than one
+    `drawString` per line. Pages after the first get a running header with the story
+    title and a page number.
+    """
+
+    def __init__(self, c, page_width: float, page_height: float, header: str, margin: float = 50,
+                 font: str = "Helvetica", size: float = 12, leading: float = 14):
+        self.c = c
+        self.page_width = page_width
+        self.page_height = page_height
+        self.header = header
+        self.margin = margin
+        self.font = font
+        self.size = size
+        self.leading = leading
+        self.max_width = page_width - 2 * margin
+        self.metrics = get_font_metrics(font, size)
+        self.page_number = 1
+        self.text = None
+        self.y = None
+
+    def start(self, y: float):
+        """Begin writing body text on the current page at height `y`."""
+        self._open_text(y)
+
+    def _open_text(self, y: float):
+        self.y = y
+        self.text = self.c.beginText(self.margin, y)
+        self.text.setFont(self.font, self.size, self.leading)
+
+    def _new_page(self):
+        self.c.drawText(self.text)
+        self.c.showPage()
+        self.page_number += 1
+        self.c.setFont("Helvetica", 9)
+        self.c.setFillGray(0.4)
+        self.c.drawString(self.margin, self.page_height - 30, self.header[:90])
+        self.c.drawRightString(self.page_width - self.margin, self.page_height - 30, str(self.page_number))
+        self.c.setFillGray(0)
+        self._open_text(self.page_height - 60)
+
+    def _line(self, line: str):
+        if self.y <= self.margin:
+            if not line:
+                return  # Don't open a page just for paragraph spacing
+            self._new_page()
+        self.text.textLine(line)
+        self.y -= self.leading
+
+    def paragraph(self, paragraph: str):
+        if CHAPTER_HEADING.match(paragraph):
+            self.heading(paragraph)
+            return
+        for line in break_lines(paragraph, self.metrics, self.max_width):
+            self._line(line)
+        self._line("")  # Blank line between paragraphs
+
+    def heading(self, heading: str):
+        # Keep a heading with at least a few lines of its chapter
+        if self.y - 5 * self.leading <= self.margin:
+            self._new_page()
+        self.text.setFont(f"{self.font}-Bold", self.size + 2, self.leading + 4)
+        for line in break_lines(heading, get_font_metrics(f"{self.font}-Bold", self.size + 2), self.max_width):
+            self.text.textLine(line)
+            self.y -= self.leading + 4
+        self.text.setFont(self.font, self.size, self.leading)
+        self._line("")
+
+    def finish(self):
+        self.c.drawText(self.text)
+        self.c.showPage()
+        return self.page_number
@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.story_generator import StoryGenerator
+from src.image_generator import ImageGenerator
+from src.tts_generator import TTSGenerator
+from src.export_story import StoryExporter
+from src.image_derivatives import ImageDerivatives
+from src.story_library import get_story_library
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def timed(timings: dict, stage: str, func, *args, **kwargs):
+    """Call `func` and record its wall-clock duration in seconds under `timings[stage]`."""
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+def tracked(timings: dict, stage: str, on_stage, func, *args, **kwargs):
+    """`timed`, reporting `on_stage(stage, status)` as the stage starts and finishes.
+
+    Status is "running", then "done", or "failed" if `func` raises or returns None.
+    """
+    on_stage(stage, "running")
+    result = None
+    try:
+        result = timed(timings, stage, func, *args, **kwargs)
+        return result
+    finally:
+        on_stage(stage, "failed" if result is None else "done")
+
+def optional_result(future, stage: str):
+    """Return the result of an optional stage, or None if it was not run or raised.
+
+    The image and speech stages are extras; an error in one of them must not discard
+    the finished story.
+    """
+    if future is None:
+        return None
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"⚠️ The {stage} stage failed: {e}")
+        return None
+
+class StoryPipeline:
+    def __init__(self, max_workers: int = 4):
+        self.story_gen = StoryGenerator()
+        self.image_gen = ImageGenerator()
+        self.tts_gen = TTSGenerator()
+        self.exporter = StoryExporter()
+        self.derivatives = ImageDerivatives()
+        self.library = get_story_library()
+        self.max_workers = max_workers
+
+    def illustrate(self, genre: str, topic: str, keywords: str):
+        """Generate the illustration and its display and PDF copies.
+
+        Returns:
+            tuple: (path of the original, bytes saved per copy), or None if generation failed
+        """
+        image_path = self.image_gen.generate_image(genre, topic, keywords)
+        if not image_path:
+            return None
+        return image_path, self.derivatives.prepare(image_path)
+
+    def run(self, genre: str, length: int, topic: str, character_name: str, keywords: str,
+            generate_image: bool = True, generate_speech: bool = True, on_story_chunk=None,
+            on_audio_preview=None, refresh_story: bool = False, on_stage=None, record: bool = True):
+        """Generate a story and its artifacts, running independent stages concurrently.
+
+        The illustration only depends on the form inputs, so it starts alongside the
+        story request. Once the story text is back, narration is synthesized while the
+        illustration finishes. Exports are not built here; `StoryExporter` renders them
+        on first request.
+        When `on_story_chunk` is given the story is streamed to it as it is written.
+        Stories come from the generation cache unless `refresh_story` is set.
+        `on_audio_preview` receives the path of the first narration chunk as soon as
+        it is synthesized; like `on_story_chunk` it is called on the thread running
+        `run`. In the app that is a `JobManager` worker with no Streamlit script context,
+        so callbacks should only record state, never call Streamlit.
+        `on_stage(stage, status)` reports progress of each stage ("running", "done"
+        or "failed") and may be called from worker threads.
+        Freshly written stories are added to the story library unless `record` is False
+        (see `record_story`); stories served from the cache are already there.
+
+        Returns:
+            dict: title, story, image_path, audio_file, per-stage `timings` in seconds,
+            story `tokens` (budgeted and used), `image_bytes_saved` per image copy
+            (empty without an illustration) and the `story_id` assigned by the story
+            library (None if the story was not recorded), or None if the story failed
+
+        Raises:
+            AzureAPIError: if a story request fails; its message says why
+        """
+        usage = {}
+        timings = {}
+        on_stage = on_stage or (lambda stage, status: None)
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        finished = False
+        try:
+            image_future = None
+            if generate_image:
+                image_future = pool.submit(tracked, timings, "image", on_stage, self.illustrate, genre, topic, keywords)
+
+            # The story runs on the thread calling `run`, so `on_story_chunk` is called there too
+            on_stage("story", "running")
+            try:
+                title, story = timed(
+                    timings, "story", self.story_gen.generate_story,
+                    genre, length, topic, character_name, keywords, on_chunk=on_story_chunk, refresh=refresh_story,
+                    usage=usage,
+                )
+            except Exception:
+                on_stage("story", "failed")
+                raise
+            on_stage("story", "done" if story else "failed")
+            if not story:
+                return None
+
+            title = title.strip().replace('"', '')
+
+            audio_future = None
+            audio_previews = queue.Queue()
+            if generate_speech:
+                audio_future = pool.submit(tracked, timings, "speech", on_stage, self.tts_gen.generate_speech, story, audio_previews.put)
+
+            # Hand the first narration chunk to the caller while the rest is still synthesizing
+            while on_audio_preview and audio_future and not audio_future.done():
+                try:
+                    on_audio_preview(audio_previews.get(timeout=0.1))
+                    break
+                except queue.Empty:
+                    pass
+
+            image_path, image_bytes_saved = optional_result(image_future, "image") or (None, {})
+            result = {
+                "title": title,
+                "story": story,
+                "image_path": image_path,
+                "image_bytes_saved": image_bytes_saved,
+                "audio_file": optional_result(audio_future, "speech"),
+            }
+            finished = True
+        finally:
+            # A failed story is reported at once, not after an image request that may run for minutes
+            pool.shutdown(wait=finished, cancel_futures=not finished)
+        result["timings"] = timings
+        result["tokens"] = {"budgeted": usage["tokens_budgeted"], "used": usage["tokens_used"]}
+        result["story_id"] = None
+        if record and not usage["cached"]:
+            self.record_story(result, genre, length, topic, character_name, keywords)
+        return result
+
+    def record_story(self, result: dict, genre: str, length: int, topic: str, character_name: str, keywords: str):
+        """Add a `run` result to the story library and set its `story_id`."""
+        result["story_id"] = self.library.add_story(
+            genre, length, topic, character_name, keywords, result["title"], result["story"],
+            image_path=result["image_path"], audio_path=result["audio_file"],
+            metadata={"timings": result["timings"], "tokens": result["tokens"],
+                      "image_bytes_saved": result["image_bytes_saved"]},
+        )
+        return result["story_id"]
+
+def get_pipeline():
+    """Return the process-wide pipeline shared by the app, the job manager and the sample pool."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = StoryPipeline()
+    return _pipeline
@@ -0,0 +1,113 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from src.config import get_setting
+
+def parse_retry_after(headers):
+    """Return the server-requested wait in seconds from `retry-after-ms`/`Retry-After`, or None."""
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+class EndpointLimiter:
+    """Token bucket plus AIMD concurrency limit for one Azure endpoint.
+
+    Requests wait for a free concurrency slot and a bucket token. A 429 halves the
+    allowed concurrency and pauses the endpoint for the server's `Retry-After`;
+    successful responses grow the limit back one request at a time.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_concurrency: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.concurrency_limit = float(max_concurrency)
+        self.in_flight = 0
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self, timeout: float = None):
+        """Block until a request may be sent to this endpoint.
+
+        Returns False if that takes longer than `timeout` seconds, True otherwise.
+        """
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.in_flight >= int(self.concurrency_limit):
+                    wait = None  # Woken by `release`
+                elif self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return True
+                if give_up_at is not None:
+                    if now >= give_up_at:
+                        return False
+                    wait = give_up_at - now if wait is None else min(wait, give_up_at - now)
+                self._condition.wait(wait)
+
+    def release(self, response=None):
+        """Free the slot taken by `acquire` and adapt the limits to the response."""
+        with self._condition:
+            self.in_flight -= 1
+            if response is not None:
+                self._adapt(response)
+            self._condition.notify_all()
+
+    def _adapt(self, response):
+        now = time.monotonic()
+        if response.status_code == 429:
+            # Multiplicative decrease, and honour the server's requested back-off
+            self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+            self.paused_until = max(self.paused_until, now + (parse_retry_after(response.headers) or 1.0))
+            return
+
+        remaining = response.headers.get("x-ratelimit-remaining-requests")
+        if remaining is not None and remaining.isdigit() and int(remaining) == 0:
+            # Quota window exhausted: hold off briefly rather than provoke a 429
+            self.paused_until = max(self.paused_until, now + (parse_retry_after(response.headers) or 1.0))
+        elif response.ok:
+            # Additive increase: roughly one extra slot per window of successful requests
+            self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(name: str):
+    """Return the process-wide limiter for an endpoint (`chat`, `dalle` or `tts`)."""
+    with _limiters_lock:
+        if name not in _limiters:
+            prefix = f"RATE_LIMIT_{name.upper()}"
+            rate = float(get_setting(f"{prefix}_RPS", 5))
+            _limiters[name] = EndpointLimiter(
+                name,
+                rate=rate,
+                burst=int(get_setting(f"{prefix}_BURST", max(1, int(rate)))),
+                max_concurrency=int(get_setting(f"{prefix}_MAX_CONCURRENCY", 8)),
+            )
+        return _limiters[name]
@@ -0,0 +1,88 @@
+import os
+import queue
+import threading
+import time
+from src.config import get_setting
+from src.http_client import backoff_delay
+from src.metrics import get_metrics
+from src.pipeline import StoryPipeline, get_pipeline
+
+# Inputs behind the "View Sample Story" button
+SAMPLE_INPUTS = {
+    "genre": "Fantasy",
+    "length": 250,
+    "topic": "A magical adventure in an enchanted forest",
+    "character_name": "Emma",
+    "keywords": "magic, forest, adventure, discovery, ancient secrets",
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+class SamplePool(threading.Thread):
+    """Background thread that keeps `depth` finished sample stories ready to hand out.
+
+    Each entry is a complete pipeline result (story, illustration and narration); its PDF
+    is rendered on demand like any other story's.
+    `take()` never blocks: it returns a ready sample or None, and wakes the thread to
+    generate a replacement.
+    """
+
+    def __init__(self, pipeline: StoryPipeline, depth: int):
+        super().__init__(name="sample-pool", daemon=True)
+        self.pipeline = pipeline
+        self.depth = depth
+        self.ready = queue.Queue()
+        self.wanted = threading.Event()
+        self.wanted.set()
+
+    def run(self):
+        failures = 0
+        while True:
+            self.wanted.wait()
+            if self.ready.qsize() >= self.depth:
+                self.wanted.clear()
+                continue
+            try:
+                # Fresh text for every entry, so consecutive samples differ
+                # Recorded in the library only when served, so unserved entries leave no rows
+                result = self.pipeline.run(**SAMPLE_INPUTS, refresh_story=True, record=False)
+            except Exception as e:
+                print(f"⚠️ Sample story generation failed: {e}")
+                result = None
+            if result:
+                self.ready.put(result)
+                failures = 0
+            else:
+                # Capped so a long outage can't overflow 2 ** attempt and kill the thread
+                time.sleep(backoff_delay(min(failures, 10)))
+                failures += 1
+
+    def take(self):
+        """Return a ready sample result, or None if the pool is empty."""
+        try:
+            while True:
+                try:
+                    result = self.ready.get_nowait()
+                except queue.Empty:
+                    get_metrics().increment("sample_pool", "miss", label_name="result")
+                    return None
+                # The artifact collector may have evicted files from a sample that sat too long
+                paths = [result["image_path"], result["audio_file"]]
+                if all(path is None or os.path.exists(path) for path in paths):
+                    get_metrics().increment("sample_pool", "hit", label_name="result")
+                    self.pipeline.record_story(result, **SAMPLE_INPUTS)
+                    return result
+        finally:
+            # Only after dequeuing, or the thread could see the queue still full and go back to sleep
+            self.wanted.set()
+
+def start_sample_pool():
+    """Start the process-wide sample pool once (no-op if `SAMPLE_POOL_DEPTH` is 0)."""
+    global _pool
+    with _pool_lock:
+        depth = int(get_setting("SAMPLE_POOL_DEPTH", 2))
+        if _pool is None and depth > 0:
+            _pool = SamplePool(get_pipeline(), depth)
+            _pool.start()
+    return _pool
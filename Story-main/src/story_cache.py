@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from src.config import get_setting
+
+def canonical_story_key(genre: str, length: int, topic: str, character_name: str, keywords: str):
+    """Build a cache key that ignores case, extra whitespace and keyword order."""
+    def normalize(value):
+        return " ".join(str(value).split()).lower()
+
+    keyword_set = sorted({normalize(kw) for kw in keywords.split(",") if kw.strip()})
+    canonical = json.dumps(
+        [normalize(genre), int(length), normalize(topic), normalize(character_name), keyword_set]
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class StoryCache:
+    """Two-tier story cache: an in-memory LRU in front of a SQLite store.
+
+    Entries expire after `ttl` seconds; the disk tier keeps at most `max_entries`
+    rows and drops the least recently used ones beyond that.
+    """
+
+    def __init__(self, db_path: str, ttl: float, max_entries: int, memory_entries: int):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stories ("
+                "key TEXT PRIMARY KEY, title TEXT, story TEXT, created_at REAL, last_access REAL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:  # Commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        """Return `(title, story)` for a cached key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry["created_at"] < self.ttl:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry["title"], entry["story"]
+            self._memory.pop(key, None)
+
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT title, story, created_at FROM stories WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[2] < self.ttl:
+                    conn.execute("UPDATE stories SET last_access = ? WHERE key = ?", (now, key))
+                    self._remember(key, {"title": row[0], "story": row[1], "created_at": row[2]})
+                    self.stats["disk_hits"] += 1
+                    return row[0], row[1]
+                if row:
+                    conn.execute("DELETE FROM stories WHERE key = ?", (key,))
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, title: str, story: str):
+        """Store a story in both tiers and evict anything expired or over the size limit."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, {"title": title, "story": story, "created_at": now})
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO stories (key, title, story, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, title, story, now, now),
+                )
+                conn.execute("DELETE FROM stories WHERE created_at < ?", (now - self.ttl,))
+                conn.execute(
+                    "DELETE FROM stories WHERE key NOT IN "
+                    "(SELECT key FROM stories ORDER BY last_access DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_story_cache():
+    """Return the process-wide story cache, shared by all Streamlit sessions."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = StoryCache(
+                    db_path=get_setting("STORY_CACHE_PATH", os.path.join("cache", "story_cache.db")),
+                    ttl=float(get_setting("STORY_CACHE_TTL", 7 * 24 * 3600)),
+                    max_entries=int(get_setting("STORY_CACHE_MAX_ENTRIES", 1000)),
+                    memory_entries=int(get_setting("STORY_CACHE_MEMORY_ENTRIES", 128)),
+                )
+    return _cache
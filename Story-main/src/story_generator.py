@@ -1,29 +1,33 @@
+import re
 from src.azure_api import AzureOpenAI
+from src.story_cache import canonical_story_key, get_story_cache
+from src.metrics import get_metrics, instrument
+from src.config import get_setting
+from src.token_budget import estimate_tokens, get_token_budget
+from src.long_form import LongFormWriter
+
+# Matches the "Title: ..." header the story prompt asks for, tolerating markdown emphasis
+TITLE_HEADER = re.compile(r"^[#*\s]*title[*\s]*:[*\s]*(.+?)[*\s]*$", re.IGNORECASE)
+TITLE_TOKEN_ALLOWANCE = 20  # Extra tokens for the title line
+CONTINUATION_PROMPT = (
+    "Your reply was cut off by the length limit. Continue the story from exactly where it "
+    "stopped, without repeating any earlier text or the title, and bring it to a satisfying ending."
+)
 
 class StoryGenerator:
     def __init__(self):
         self.azure_api = AzureOpenAI()
-    
-    def generate_story(self, genre: str, length: int, topic: str, character_name: str, keywords: str):
-        """Generate a story ensuring it fully completes within a higher token limit.
-        
-        Args:
-            genre (str): Story genre (Fantasy, Sci-Fi, etc.)
-            length (int): Target word count
-            topic (str): Theme/topic of the story, can include setting and era
-            character_name (str): Main character name
-            keywords (str): Comma-separated keywords
-            
-        Returns:
-            tuple: (title, story_text)
-        """
+        self.cache = get_story_cache()
+        self.budget = get_token_budget()
+        self.max_continuations = int(get_setting("STORY_MAX_CONTINUATIONS", 2))
+        self.long_form = LongFormWriter(self)
+        self.long_form_min_words = int(get_setting("LONG_FORM_MIN_WORDS", 2000))
+
+    def _build_story_prompt(self, genre: str, length: int, topic: str, character_name: str, keywords: str):
         keyword_list = [kw.strip() for kw in keywords.split(",") if kw.strip()]
         formatted_keywords = ", ".join(keyword_list)
-        
-        # Adjust `max_tokens` to ensure full completion
-        max_token_limit = length * 1.5  # Allocate extra tokens to avoid truncation
-        
-        story_prompt = (
+
+        return (
             f"Write a **complete {genre} short story** in **approximately {length} words**. "
             f"The story must have a **proper beginning, middle, and satisfying ending**. "
             f"Ensure the last sentence **completes the story logically** and does not get cut off. "
@@ -37,20 +41,212 @@ class StoryGenerator:
             f"Make the story emotionally resonant with a satisfying conclusion. "
             f"Carefully adhere to the {genre} genre conventions while being creative. "
             f"The final sentence must provide closure to the story. "
+            f"\n\nBegin your response with a single line of the form `Title: <title>` containing a "
+            f"short, catchy title (5-8 words) that reflects the {genre} genre, followed by a blank "
+            f"line and then the story itself."
         )
-        
-        # Generate story with increased token limit
-        story_response = self.azure_api.generate_response(story_prompt, max_tokens=int(max_token_limit))
-        story_text = story_response.strip() if story_response else None
-        
-        # Generate title separately
+
+    @staticmethod
+    def _split_title(text: str):
+        """Split a `Title: ...` header line off the response.
+
+        Returns:
+            tuple: (title or None if no header was found, story body)
+        """
+        first_line, _, body = text.strip().partition("\n")
+        match = TITLE_HEADER.match(first_line)
+        if not match:
+            return None, text
+        title = match.group(1).strip().strip('"').strip()
+        return title or None, body
+
+    def stream_story(self, genre: str, length: int, topic: str, character_name: str, keywords: str,
+                     usage: dict = None):
+        """Yield the raw response, `Title:` header included, in chunks as the model produces it.
+
+        The generator's return value is the final `finish_reason` (see `_generate_parts`).
+        """
+        story_prompt = self._build_story_prompt(genre, length, topic, character_name, keywords)
+        return (yield from self._generate_parts(story_prompt, length, stream=True, usage=usage))
+
+    def _generate_parts(self, prompt: str, length: int, stream: bool, usage: dict = None):
+        """Yield the story text, asking for a continuation whenever the token limit cuts it off.
+
+        The first request is budgeted for the whole story; each continuation (at most
+        `max_continuations`) for the words still missing, but never less than a quarter of
+        the story. When `stream` is False each request yields its text in one piece.
+        Every request's limit also leaves room for its prompt in the context window.
+        Tokens budgeted and used are added to `usage["tokens_budgeted"]` and
+        `usage["tokens_used"]` when `usage` is given; they are recorded with the token
+        budget only if the service reported usage for every request, so it learns from
+        real counts rather than from `estimate_tokens`.
+
+        The generator's return value is the last request's `finish_reason`; None means the
+        model never said it had finished, so the text is incomplete and must not be kept.
+        A failed request raises `AzureAPIError`.
+        """
+        text = ""
+        finish_reason = None
+        budgeted = used = 0
+        estimated = False  # Whether any request's usage had to be estimated
+        for continuation in range(self.max_continuations + 1):
+            if continuation:
+                messages = [
+                    {"role": "user", "content": prompt},
+                    {"role": "assistant", "content": text},
+                    {"role": "user", "content": CONTINUATION_PROMPT},
+                ]
+                max_tokens = self.budget.max_tokens(max(length - len(text.split()), length // 4), messages)
+                if not text[-1].isspace():
+                    text += " "
+                    yield " "
+            else:
+                messages = prompt
+                max_tokens = self.budget.max_tokens(length, messages, extra=TITLE_TOKEN_ALLOWANCE)
+            budgeted += max_tokens
+
+            if stream:
+                parts = []
+                completion = yield from self._tee(self.azure_api.stream_response(messages, max_tokens), parts)
+                part = "".join(parts)
+            else:
+                completion = self.azure_api.generate_completion(messages, max_tokens)
+                part = completion["content"] or ""
+                if part:
+                    yield part
+            finish_reason = completion["finish_reason"]
+            if completion["completion_tokens"] is None:
+                estimated = True
+                used += estimate_tokens(part)
+            else:
+                used += completion["completion_tokens"]
+
+            text += part
+            if finish_reason != "length" or not part:
+                break
+
+        if text.strip() and finish_reason is not None and not estimated:
+            self.budget.record(budgeted, used, len(text.split()), continuation)
+        if usage is not None:
+            usage["tokens_budgeted"] = usage.get("tokens_budgeted", 0) + budgeted
+            usage["tokens_used"] = usage.get("tokens_used", 0) + used
+        return finish_reason
+
+    def complete(self, prompt: str, words: int, usage: dict = None):
+        """Return the full text for a prompt expected to produce about `words` words.
+
+        Returns an empty string rather than a partial text if the model did not finish;
+        raises `AzureAPIError` if a request fails.
+        """
+        parts = []
+        finish_reason = self._drain(self._generate_parts(prompt, words, stream=False, usage=usage), parts)
+        return "".join(parts) if finish_reason is not None else ""
+
+    @staticmethod
+    def _drain(stream, parts: list):
+        """Consume a generator into `parts`; returns the generator's return value."""
+        while True:
+            try:
+                parts.append(next(stream))
+            except StopIteration as stop:
+                return stop.value
+    @staticmethod
+    def _tee(stream, parts: list):
+        """Relay a generator, appending each chunk to `parts`; returns the generator's return value."""
+        while True:
+            try:
+                chunk = next(stream)
+            except StopIteration as stop:
+                return stop.value
+            parts.append(chunk)
+            yield chunk
+
+    @instrument("title", measure=lambda title: len(title.encode("utf-8")))
+    def generate_title(self, genre: str, story_text: str):
+        """Generate a short title for an already written story.
+
+        Only used as a fallback when the story response did not start with a title line.
+        """
+        if not story_text:
+            return "Untitled Story"
+
         title_prompt = (
             f"Create a short, catchy title (5-8 words) for the following story. "
             f"The title should be evocative, intriguing, and reflect the {genre} genre. "
             f"Return ONLY the title (no quotes, no extra text).\n\nStory:\n{story_text[:500]}..."
         )
-        
+
         title_response = self.azure_api.generate_response(title_prompt, max_tokens=15)
-        story_title = title_response.strip() if title_response else "Untitled Story"
-        
+        return title_response.strip() if title_response else "Untitled Story"
+
+    def generate_story(self, genre: str, length: int, topic: str, character_name: str, keywords: str,
+                       on_chunk=None, refresh: bool = False, usage: dict = None):
+        """Generate a story ensuring it fully completes within a higher token limit.
+
+        Args:
+            genre (str): Story genre (Fantasy, Sci-Fi, etc.)
+            length (int): Target word count
+            topic (str): Theme/topic of the story, can include setting and era
+            character_name (str): Main character name
+            keywords (str): Comma-separated keywords
+            on_chunk (callable): Optional; when given, the story is streamed and
+                `on_chunk(text_so_far)` is called as each chunk arrives
+            refresh (bool): Skip the cache lookup and store a freshly generated story
+            usage (dict): Optional; filled with `cached` (whether the story came from the
+                cache) and the `tokens_budgeted` and `tokens_used` by the story requests
+
+        Returns:
+            tuple: (title, story_text)
+        """
+        metrics = get_metrics()
+        usage = {} if usage is None else usage
+        usage.update(cached=False, tokens_budgeted=0, tokens_used=0)
+        cache_key = canonical_story_key(genre, length, topic, character_name, keywords)
+        if not refresh:
+            cached = self.cache.get(cache_key)
+            metrics.increment("story_cache_lookups", "hit" if cached else "miss", label_name="result")
+            if cached:
+                usage["cached"] = True
+                story_title, story_text = cached
+                if on_chunk:
+                    on_chunk(story_text)
+                return story_title, story_text
+
+        with metrics.span("story") as span:
+            if length >= self.long_form_min_words:
+                # Outline, then chapters in parallel; streams chapter by chapter instead of token by token
+                story_response = self.long_form.write(genre, length, topic, character_name, keywords, on_chunk, usage)
+            elif on_chunk:
+                story_response = ""
+                story_stream = self.stream_story(genre, length, topic, character_name, keywords, usage)
+                while True:
+                    try:
+                        chunk = next(story_stream)
+                    except StopIteration as stop:
+                        if stop.value is None:
+                            story_response = ""  # The stream broke off; don't keep a truncated story
+                        break
+                    story_response += chunk
+                    if "\n" not in story_response.strip():
+                        continue  # Still receiving the title line
+                    _, partial_story = self._split_title(story_response)
+                    if partial_story.strip():
+                        on_chunk(partial_story.strip())
+            else:
+                story_prompt = self._build_story_prompt(genre, length, topic, character_name, keywords)
+                story_response = self.complete(story_prompt, length, usage)
+            span.add_bytes(len((story_response or "").encode("utf-8")))
+            if not story_response:
+                span.fail()
+        story_title, story_text = self._split_title(story_response or "")
+        story_text = story_text.strip() or None
+
+        # Fall back to a separate title request only if the header could not be parsed
+        if story_text and not story_title:
+            story_title = self.generate_title(genre, story_text)
+        story_title = story_title or "Untitled Story"
+
+        if story_text:
+            self.cache.put(cache_key, story_title, story_text)
+
         return story_title, story_text
@@ -0,0 +1,136 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from src.config import get_setting
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    genre TEXT, length INTEGER, topic TEXT, character_name TEXT, keywords TEXT,
+    title TEXT NOT NULL, story TEXT NOT NULL,
+    image_path TEXT, audio_path TEXT,
+    word_count INTEGER,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS stories_created_at ON stories (created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS stories_fts USING fts5(
+    title, story, topic, keywords, content='stories', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS stories_ai AFTER INSERT ON stories BEGIN
+    INSERT INTO stories_fts (rowid, title, story, topic, keywords)
+    VALUES (new.id, new.title, new.story, new.topic, new.keywords);
+END;
+CREATE TRIGGER IF NOT EXISTS stories_ad AFTER DELETE ON stories BEGIN
+    INSERT INTO stories_fts (stories_fts, rowid, title, story, topic, keywords)
+    VALUES ('delete', old.id, old.title, old.story, old.topic, old.keywords);
+END;
+"""
+
+LIST_COLUMNS = "s.id, s.created_at, s.genre, s.title, s.word_count"
+
+def to_fts_query(text: str):
+    """Turn free text into a safe FTS5 query: every word must match, as a prefix."""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+class StoryLibrary:
+    """Persistent, searchable record of every generated story."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # Commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def add_story(self, genre, length, topic, character_name, keywords, title, story,
+                  image_path=None, audio_path=None, metadata=None):
+        """Record a generated story and return its id."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO stories (created_at, genre, length, topic, character_name, keywords, "
+                "title, story, image_path, audio_path, word_count, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), genre, length, topic, character_name, keywords, title, story,
+                 image_path, audio_path, len(story.split()), json.dumps(metadata or {})),
+            )
+            return cursor.lastrowid
+
+    def get_story(self, story_id: int):
+        """Return a stored story as a dict, or None if it does not exist."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM stories WHERE id = ?", (story_id,)).fetchone()
+        if row is None:
+            return None
+        story = dict(row)
+        story["metadata"] = json.loads(story["metadata"] or "{}")
+        return story
+
+    def get_summary(self, story_id: int):
+        """Return a story's id, title, genre, artifact paths and word count without its text, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, title, genre, image_path, audio_path, word_count FROM stories WHERE id = ?", (story_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def artifact_paths(self):
+        """Return the set of illustration and narration paths referenced by stored stories."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT image_path, audio_path FROM stories").fetchall()
+        return {path for row in rows for path in row if path}
+
+    def search(self, query: str = "", page: int = 1, page_size: int = 10):
+        """Return one page of stories, optionally filtered by a full-text query.
+
+        Without a query stories are listed newest first; with one, best matches (FTS5 rank) first.
+
+        Returns:
+            tuple: (list of dicts with id, created_at, genre, title, word_count, snippet; total count)
+        """
+        offset = (max(page, 1) - 1) * page_size
+        fts_query = to_fts_query(query)
+        with self._connect() as conn:
+            if fts_query:
+                total = conn.execute(
+                    "SELECT COUNT(*) FROM stories_fts WHERE stories_fts MATCH ?", (fts_query,)
+                ).fetchone()[0]
+                rows = conn.execute(
+                    f"SELECT {LIST_COLUMNS}, snippet(stories_fts, 1, '**', '**', '…', 24) AS snippet "
+                    "FROM stories_fts JOIN stories s ON s.id = stories_fts.rowid "
+                    "WHERE stories_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?",
+                    (fts_query, page_size, offset),
+                ).fetchall()
+            else:
+                total = conn.execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+                rows = conn.execute(
+                    f"SELECT {LIST_COLUMNS}, substr(s.story, 1, 160) || '…' AS snippet "
+                    "FROM stories s ORDER BY s.created_at DESC LIMIT ? OFFSET ?",
+                    (page_size, offset),
+                ).fetchall()
+        return [dict(row) for row in rows], total
+
+_library = None
+_library_lock = threading.Lock()
+
+def get_story_library():
+    """Return the process-wide story library."""
+    global _library
+    if _library is None:
+        with _library_lock:
+            if _library is None:
+                _library = StoryLibrary(get_setting("STORY_LIBRARY_PATH", os.path.join("library", "stories.db")))
+    return _library
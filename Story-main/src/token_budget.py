@@ -0,0 +1,81 @@
+import math
+import threading
+from collections import deque
+from src.config import get_setting
+from src.metrics import get_metrics
+
+def estimate_tokens(text: str):
+    """Rough token count for English prose: the larger of ~4 characters or ~1.3 words per token."""
+    if not text:
+        return 0
+    return math.ceil(max(len(text) / 4, len(text.split()) * 1.3))
+
+def estimate_prompt_tokens(prompt):
+    """Rough token count of a prompt string or a list of chat messages (with per-message overhead)."""
+    if isinstance(prompt, str):
+        return estimate_tokens(prompt)
+    return sum(estimate_tokens(message["content"]) + 4 for message in prompt)
+
+class TokenBudget:
+    """Chooses `max_tokens` for a target word count and learns from how much was used.
+
+    The budget is `words * tokens_per_word * headroom`. `tokens_per_word` starts at the
+    configured value and, once `min_samples` completions are recorded, follows the 90th
+    percentile of recently observed ratios so most stories fit in a single request.
+    Only ratios from service-reported usage are learned from. The budget is capped so the
+    prompt and the completion fit in the model's `context_tokens`.
+    """
+
+    def __init__(self, tokens_per_word: float, headroom: float, context_tokens: int,
+                 window: int = 200, min_samples: int = 20):
+        self.default_ratio = tokens_per_word
+        self.headroom = headroom
+        self.context_tokens = context_tokens
+        self.min_samples = min_samples
+        self.ratios = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def tokens_per_word(self):
+        with self._lock:
+            if len(self.ratios) < self.min_samples:
+                return self.default_ratio
+            ordered = sorted(self.ratios)
+        return ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))]
+
+    def max_tokens(self, words: int, prompt=None, extra: int = 0):
+        """Token limit for a completion of roughly `words` words (plus `extra` tokens).
+
+        With `prompt` (a string or chat messages), the limit also leaves room for the prompt
+        in the context window, since continuations resend the whole story so far.
+        """
+        budget = math.ceil(words * self.tokens_per_word() * self.headroom) + extra
+        if prompt is not None:
+            budget = min(budget, self.context_tokens - estimate_prompt_tokens(prompt))
+        return max(1, budget)
+
+    def record(self, budgeted: int, used: int, words: int, continuations: int):
+        """Record one finished story: tokens budgeted and used, words produced, continuations needed."""
+        metrics = get_metrics()
+        metrics.increment("story_tokens", "budgeted", budgeted, label_name="kind")
+        metrics.increment("story_tokens", "used", used, label_name="kind")
+        metrics.increment("story_requests", "initial", label_name="kind")
+        metrics.increment("story_requests", "continuation", continuations, label_name="kind")
+        if words:
+            with self._lock:
+                self.ratios.append(used / words)
+
+_budget = None
+_budget_lock = threading.Lock()
+
+def get_token_budget():
+    """Return the process-wide token budget."""
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                _budget = TokenBudget(
+                    tokens_per_word=float(get_setting("TOKENS_PER_WORD", 1.4)),
+                    headroom=float(get_setting("TOKEN_BUDGET_HEADROOM", 1.15)),
+                    context_tokens=int(get_setting("MODEL_CONTEXT_TOKENS", 128000)),
+                )
+    return _budget
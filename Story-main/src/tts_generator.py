@@ -1,31 +1,74 @@
+import re
 import requests
-import streamlit as st
-import time
-import os
+from src import http_client
+from src.config import get_setting
+from src.artifact_store import get_artifact_store, inputs_key
+from src.metrics import file_size, instrument
+from concurrent.futures import ThreadPoolExecutor
+
+TTS_INPUT_LIMIT = 4096  # Maximum characters the tts-1 endpoint accepts per request
+
+def split_text(text: str, max_chars: int):
+    """Split text into chunks of at most `max_chars`, preferring paragraph then sentence boundaries."""
+    chunks = []
+    current = ""
+    for paragraph in (p.strip() for p in text.split("\n")):
+        if not paragraph:
+            continue
+        pieces = [paragraph]
+        if len(paragraph) > max_chars:
+            pieces = re.split(r"(?<=[.!?])\s+", paragraph)
+        for index, piece in enumerate(pieces):
+            separator = " " if index else "\n"
+            # A single sentence longer than the limit is cut at word boundaries
+            while len(piece) > max_chars:
+                cut = piece.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(piece[:cut].strip())
+                piece = piece[cut:].strip()
+            if current and len(current) + len(separator) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}{separator}{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def strip_id3(mp3_bytes: bytes, keep_header: bool = False):
+    """Drop ID3v2 headers and ID3v1 trailers so MP3 chunks can be joined frame to frame.
+
+    With `keep_header` the leading ID3v2 header stays (for the first chunk of a file).
+    """
+    if not keep_header and mp3_bytes[:3] == b"ID3" and len(mp3_bytes) >= 10:
+        size = 0
+        for byte in mp3_bytes[6:10]:  # Syncsafe integer: 7 bits per byte
+            size = (size << 7) | (byte & 0x7F)
+        footer = 10 if mp3_bytes[5] & 0x10 else 0
+        mp3_bytes = mp3_bytes[10 + size + footer:]
+    if len(mp3_bytes) >= 128 and mp3_bytes[-128:-125] == b"TAG":
+        mp3_bytes = mp3_bytes[:-128]
+    return mp3_bytes
 
 class TTSGenerator:
-    def __init__(self):
-        self.TTS_ENDPOINT = st.secrets.get("AZURE_TTS_ENDPOINT", None)
-        self.API_KEY = st.secrets.get("AZURE_OPENAI_API_KEY", None)
+    def __init__(self, store=None):
+        self.TTS_ENDPOINT = get_setting("AZURE_TTS_ENDPOINT")
+        self.API_KEY = get_setting("AZURE_OPENAI_API_KEY")
 
         if not self.TTS_ENDPOINT or not self.API_KEY:
             print("⚠️ Warning: Missing Azure TTS API credentials. Check `secrets.toml`.")
 
-        # Ensure `output_audio/` directory exists
-        self.audio_dir = "output_audio"
-        os.makedirs(self.audio_dir, exist_ok=True)
-
-    def generate_speech(self, text):
-        """Convert story text to speech using Azure OpenAI TTS API and return the audio file path."""
-        if not self.TTS_ENDPOINT or not self.API_KEY:
-            return None  # Silent failure if missing keys
+        # Smaller chunks reach the first playable audio sooner; never exceed the endpoint limit
+        self.chunk_chars = min(int(get_setting("TTS_CHUNK_CHARS", 1500)), TTS_INPUT_LIMIT)
+        self.max_workers = int(get_setting("TTS_MAX_WORKERS", 4))
 
-        headers = {
-            "Content-Type": "application/json",
-            "api-key": self.API_KEY,
-        }
+        # Audio is stored by a hash of its inputs, so identical narrations are synthesized once
+        self.store = store or get_artifact_store()
 
-        payload = {
+    def _payload(self, text):
+        return {
             "model": "tts-1",
             "input": text,
             "voice": "alloy",
@@ -33,16 +76,57 @@ class TTSGenerator:
             "speed": 1.0
         }
 
+    @instrument("tts_chunk", measure=len)
+    def _synthesize(self, text):
+        """Synthesize one chunk of text and return the MP3 bytes."""
+        headers = {
+            "Content-Type": "application/json",
+            "api-key": self.API_KEY,
+        }
+
+        payload = self._payload(text)
+
+        response = http_client.post(self.TTS_ENDPOINT, endpoint="tts", headers=headers, json=payload)
+        response.raise_for_status()
+        return response.content
+
+    @instrument("tts", measure=file_size)
+    def generate_speech(self, text, on_first_chunk=None):
+        """Convert story text to speech using Azure OpenAI TTS API and return the audio file path.
+
+        The text is split on paragraph/sentence boundaries and the chunks are synthesized
+        concurrently. When `on_first_chunk` is given it is called with the path of the first
+        chunk's audio as soon as that is ready, so playback can start before the rest is done.
+        """
+        if not self.TTS_ENDPOINT or not self.API_KEY:
+            return None  # Silent failure if missing keys
+
+        audio_key = inputs_key(self._payload(text))
+        existing = self.store.get(audio_key, "mp3")
+        if existing:
+            return existing
+
+        chunks = split_text(text, self.chunk_chars)
+        if not chunks:
+            return None
+
         try:
-            response = requests.post(self.TTS_ENDPOINT, headers=headers, json=payload)
-            response.raise_for_status()
-            
-            # Save audio file in `output_audio/` folder
-            audio_filename = os.path.join(self.audio_dir, f"story_{int(time.time())}.mp3")
-            with open(audio_filename, "wb") as audio_file:
-                audio_file.write(response.content)
-
-            return audio_filename
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(self._synthesize, chunk) for chunk in chunks]
+
+                # Written atomically: nothing appears at the final path until every chunk is joined
+                with self.store.open_write(audio_key, "mp3") as audio_file:
+                    first_part = futures[0].result()
+                    # Its header can stay, but a trailer would end up mid-file once more chunks follow
+                    audio_file.write(strip_id3(first_part, keep_header=True) if len(futures) > 1 else first_part)
+                    if on_first_chunk and len(futures) > 1:
+                        # The preview is a standalone file, so it keeps its tags
+                        on_first_chunk(self.store.put_bytes(first_part, "mp3"))
+
+                    for future in futures[1:]:
+                        audio_file.write(strip_id3(future.result()))
+
+            return self.store.path_for(audio_key, "mp3")
 
         except requests.exceptions.RequestException as e:
             print(f"⚠️ Azure OpenAI TTS Error: {e}")  # Silent failure
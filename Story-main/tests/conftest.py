@@ -0,0 +1,4 @@
+import os
+
+# Settings are read from the environment first; keep metrics quiet during tests
+os.environ.setdefault("METRICS_JSON_LOGS", "false")
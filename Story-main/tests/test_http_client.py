@@ -0,0 +1,106 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from src import http_client
+from src.rate_limiter import EndpointLimiter
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers each POST with the next status in `statuses` (the last one repeats)."""
+    protocol_version = "HTTP/1.1"
+    statuses = [200]
+    requests_seen = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        cls = type(self)
+        status = cls.statuses[min(cls.requests_seen, len(cls.statuses) - 1)]
+        cls.requests_seen += 1
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def server():
+    handler = type("Handler", (ScriptedHandler,), {"statuses": [200], "requests_seen": 0})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield handler, f"http://127.0.0.1:{httpd.server_port}/tts"
+    httpd.shutdown()
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = EndpointLimiter("tts", rate=1000, burst=1000, max_concurrency=4)
+    monkeypatch.setattr(http_client, "get_limiter", lambda name: limiter)
+    monkeypatch.setenv("HTTP_BACKOFF_BASE", "0.01")
+    return limiter
+
+def test_retryable_statuses_are_retried(server, limiter):
+    handler, url = server
+    handler.statuses = [500, 503, 200]
+    response = http_client.post(url, endpoint="tts", json={})
+    assert response.status_code == 200
+    assert handler.requests_seen == 3
+    assert limiter.in_flight == 0
+
+def test_last_response_is_returned_once_retries_run_out(server, limiter, monkeypatch):
+    handler, url = server
+    handler.statuses = [500]
+    monkeypatch.setenv("HTTP_MAX_RETRIES", "1")
+    response = http_client.post(url, endpoint="tts", json={})
+    assert response.status_code == 500
+    assert handler.requests_seen == 2
+
+def test_client_errors_are_not_retried(server, limiter):
+    handler, url = server
+    handler.statuses = [400, 200]
+    assert http_client.post(url, endpoint="tts", json={}).status_code == 400
+    assert handler.requests_seen == 1
+
+def test_retries_stop_at_the_deadline(server, limiter, monkeypatch):
+    handler, url = server
+    handler.statuses = [429]  # No Retry-After: the limiter pauses for a second each time
+    monkeypatch.setenv("HTTP_MAX_RETRIES", "100")
+    monkeypatch.setenv("DEADLINE_TTS", "0.5")
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        http_client.post(url, endpoint="tts", json={})
+    assert time.monotonic() - start < 1.0
+    assert handler.requests_seen == 1
+    assert limiter.concurrency_limit == 2
+
+def test_streamed_response_holds_its_slot_until_closed(server, limiter):
+    _, url = server
+    response = http_client.post(url, endpoint="tts", json={}, stream=True)
+    assert limiter.in_flight == 1
+    with response:
+        response.content
+    assert limiter.in_flight == 0
+    response.close()  # A second close must not free a slot twice
+    assert limiter.in_flight == 0
+
+def test_release_on_close_releases_even_if_close_fails():
+    limiter = EndpointLimiter("tts", rate=1000, burst=1000, max_concurrency=4)
+    limiter.acquire()
+
+    class BrokenResponse:
+        status_code = 200
+        ok = True
+        headers = {}
+
+        def close(self):
+            raise OSError("connection reset")
+
+    response = BrokenResponse()
+    http_client._release_on_close(response, limiter)
+    with pytest.raises(OSError):
+        response.close()
+    assert limiter.in_flight == 0
@@ -0,0 +1,42 @@
+from src.pdf_layout import SOFT_HYPHEN, break_lines, get_font_metrics
+
+METRICS = get_font_metrics("Helvetica", 12)
+
+def width(line):
+    return METRICS.word_width(line)
+
+def test_lines_fit_and_keep_every_word():
+    paragraph = " ".join(["The lantern swung over the silent river while Emma counted the stars."] * 20)
+    lines = break_lines(paragraph, METRICS, 300)
+    assert len(lines) > 1
+    assert all(width(line) <= 300 for line in lines)
+    assert " ".join(lines).split() == paragraph.split()
+
+def test_words_without_hyphens_are_not_split():
+    paragraph = "She stared at the incomprehensibilities and exclaimed, astonished by everything"
+    lines = break_lines(paragraph, METRICS, 120)
+    assert " ".join(lines).split() == paragraph.split()
+    assert not any(line.endswith("-") for line in lines)
+
+def test_breaks_at_existing_hyphen():
+    lines = break_lines("aaaaaaaaaaaaaaaaaaaaa well-meaning neighbours", METRICS, width("aaaaaaaaaaaaaaaaaaaaa well-mean"))
+    assert lines[0].endswith("well-")
+    assert lines[1].startswith("meaning")
+
+def test_soft_hyphen_only_shown_at_break():
+    word = f"extra{SOFT_HYPHEN}ordinary"
+    assert break_lines(f"an {word} day", METRICS, 500) == ["an extraordinary day"]
+    lines = break_lines(f"an {word}", METRICS, width("an extraord"))
+    assert lines == ["an extra-", "ordinary"]
+
+def test_urls_and_numbers_are_never_hyphenated():
+    for word in ["https://example.com/very-long-path-name", "1990-2020"]:
+        lines = break_lines(f"aaaaaaaaaaaaaaaaaaaa {word}", METRICS, width(f"aaaaaaaaaaaaaaaaaaaa {word[:-2]}"))
+        assert lines == ["aaaaaaaaaaaaaaaaaaaa", word]
+
+def test_overlong_word_is_cut_without_stray_hyphen():
+    word = '"' + "x" * 200
+    lines = break_lines(f"start {word}", METRICS, 200)
+    assert lines[0] == "start"
+    assert "".join(lines[1:]) == word
+    assert all(width(line) <= 200 for line in lines)
@@ -0,0 +1,60 @@
+import time
+import requests
+from src.rate_limiter import EndpointLimiter, parse_retry_after
+
+def response(status, **headers):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers.update(headers)
+    return resp
+
+def test_429_halves_concurrency_and_pauses_for_retry_after():
+    limiter = EndpointLimiter("test", rate=100, burst=10, max_concurrency=8)
+    assert limiter.acquire()
+    before = time.monotonic()
+    limiter.release(response(429, **{"Retry-After": "2"}))
+    assert limiter.concurrency_limit == 4
+    assert limiter.in_flight == 0
+    assert before + 1.9 <= limiter.paused_until <= time.monotonic() + 2
+
+def test_success_grows_concurrency_one_slot_per_window():
+    limiter = EndpointLimiter("test", rate=100, burst=10, max_concurrency=8)
+    limiter.concurrency_limit = 4.0
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(response(200))
+    assert 4.9 < limiter.concurrency_limit < 5.0
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release(response(200))
+    assert limiter.concurrency_limit == 8
+
+def test_exhausted_quota_pauses_without_shrinking_concurrency():
+    limiter = EndpointLimiter("test", rate=100, burst=10, max_concurrency=8)
+    limiter.acquire()
+    limiter.release(response(200, **{"x-ratelimit-remaining-requests": "0", "retry-after-ms": "500"}))
+    assert limiter.concurrency_limit == 8
+    assert limiter.paused_until > time.monotonic() + 0.4
+
+def test_acquire_times_out_when_no_slot_frees_up():
+    limiter = EndpointLimiter("test", rate=100, burst=10, max_concurrency=1)
+    assert limiter.acquire(timeout=0.1)
+    start = time.monotonic()
+    assert not limiter.acquire(timeout=0.1)
+    assert 0.1 <= time.monotonic() - start < 0.5
+    limiter.release()
+    assert limiter.acquire(timeout=0.1)
+
+def test_acquire_waits_out_a_pause():
+    limiter = EndpointLimiter("test", rate=100, burst=10, max_concurrency=8)
+    limiter.paused_until = time.monotonic() + 0.2
+    assert not limiter.acquire(timeout=0.05)
+    start = time.monotonic()
+    assert limiter.acquire(timeout=1)
+    assert time.monotonic() - start >= 0.1
+
+def test_parse_retry_after():
+    assert parse_retry_after({"retry-after-ms": "1500"}) == 1.5
+    assert parse_retry_after({"Retry-After": "3"}) == 3.0
+    assert parse_retry_after({"Retry-After": "soon"}) is None
+    assert parse_retry_after({}) is None
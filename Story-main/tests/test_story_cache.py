@@ -0,0 +1,51 @@
+import time
+from src.story_cache import StoryCache, canonical_story_key
+
+def make_cache(tmp_path, ttl=3600, max_entries=100, memory_entries=10):
+    return StoryCache(str(tmp_path / "cache.db"), ttl=ttl, max_entries=max_entries, memory_entries=memory_entries)
+
+def test_key_ignores_case_whitespace_and_keyword_order():
+    key = canonical_story_key("Fantasy", 500, "A lost  dragon", "Emma", "magic, forest")
+    assert key == canonical_story_key(" fantasy", 500, "a LOST dragon ", "emma", "Forest,magic, ,")
+    assert key == canonical_story_key("Fantasy", 500, "A lost dragon", "Emma", "magic, forest, magic")
+
+def test_key_depends_on_every_input():
+    key = canonical_story_key("Fantasy", 500, "A lost dragon", "Emma", "magic, forest")
+    assert key != canonical_story_key("Fantasy", 750, "A lost dragon", "Emma", "magic, forest")
+    assert key != canonical_story_key("Fantasy", 500, "A lost dragon", "Noah", "magic, forest")
+    assert key != canonical_story_key("Fantasy", 500, "A lost dragon", "Emma", "magic")
+    assert key != canonical_story_key("Fantasy", 500, "A lost dragon", "Emma", "magic forest")
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    make_cache(tmp_path).put("key", "Title", "Story")
+    cache = make_cache(tmp_path)
+    assert cache.get("key") == ("Title", "Story")
+    assert cache.get("key") == ("Title", "Story")
+    assert cache.stats == {"memory_hits": 1, "disk_hits": 1, "misses": 0}
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = make_cache(tmp_path, ttl=0.1)
+    cache.put("key", "Title", "Story")
+    time.sleep(0.15)
+    assert cache.get("key") is None
+    assert make_cache(tmp_path, ttl=3600).get("key") is None  # Deleted from disk as well
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2, memory_entries=1)
+    cache.put("a", "A", "Story a")
+    cache.put("b", "B", "Story b")
+    assert cache.get("a") == ("A", "Story a")  # From disk; now more recent than "b"
+    cache.put("c", "C", "Story c")
+    assert cache.get("b") is None
+    assert cache.get("a") == ("A", "Story a")
+    assert cache.get("c") == ("C", "Story c")
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, memory_entries=2)
+    cache.put("a", "A", "Story a")
+    cache.put("b", "B", "Story b")
+    cache.get("a")
+    cache.put("c", "C", "Story c")
+    assert list(cache._memory) == ["a", "c"]
+    assert cache.get("b") == ("B", "Story b")
+    assert cache.stats["disk_hits"] == 1
@@ -0,0 +1,62 @@
+import pytest
+from benchmarks.mock_azure import MockConfig, start_mock_server
+from src import http_client
+from src.rate_limiter import EndpointLimiter
+from src.token_budget import TokenBudget
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    # The mock reports twice as many tokens per word as the budget expects, so the first request is cut off
+    server = start_mock_server(MockConfig(latency=0, jitter=0, tokens_per_word=2.0))
+    monkeypatch.setenv("AZURE_OPENAI_API_ENDPOINT", f"http://127.0.0.1:{server.server_port}/chat")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "test")
+    monkeypatch.setenv("STORY_CACHE_PATH", str(tmp_path / "story_cache.db"))
+    limiter = EndpointLimiter("chat", rate=1000, burst=1000, max_concurrency=4)
+    monkeypatch.setattr(http_client, "get_limiter", lambda name: limiter)
+
+    from src.story_generator import StoryGenerator
+    gen = StoryGenerator()
+    gen.budget = TokenBudget(tokens_per_word=1.0, headroom=1.0, context_tokens=128000)
+    yield gen
+    server.shutdown()
+
+def generate(gen, stream, usage):
+    prompt = gen._build_story_prompt("Fantasy", 100, "A lost dragon", "Emma", "magic")
+    parts = []
+    finish_reason = gen._drain(gen._generate_parts(prompt, 100, stream=stream, usage=usage), parts)
+    return finish_reason, "".join(parts)
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_cut_off_story_is_continued(generator, stream):
+    usage = {}
+    finish_reason, text = generate(generator, stream, usage)
+    assert finish_reason == "stop"
+    # 120 tokens (100 words plus the title allowance) cut the response at 61 words, title
+    # included; the continuation is budgeted for the 39 words still missing
+    assert usage == {"tokens_budgeted": 120 + 39, "tokens_used": 120 + 26}
+    assert len(text.split()) == 61 + 13
+    assert list(generator.budget.ratios) == [146 / 74]
+
+def test_continuations_are_limited(generator):
+    generator.max_continuations = 0
+    usage = {}
+    finish_reason, text = generate(generator, False, usage)
+    assert finish_reason == "length"
+    assert len(text.split()) == 61
+    assert usage == {"tokens_budgeted": 120, "tokens_used": 120}
+
+def test_estimated_usage_is_not_learned(generator, monkeypatch):
+    def completion_without_usage(messages, max_tokens):
+        return {"content": "Title: The Lost Dragon\n\nA short tale.", "finish_reason": "stop", "completion_tokens": None}
+
+    monkeypatch.setattr(generator.azure_api, "generate_completion", completion_without_usage)
+    usage = {}
+    assert generate(generator, False, usage)[0] == "stop"
+    assert usage["tokens_used"] > 0
+    assert list(generator.budget.ratios) == []
+
+def test_budget_leaves_room_for_the_prompt(generator):
+    generator.budget.context_tokens = 300
+    prompt = generator._build_story_prompt("Fantasy", 100, "A lost dragon", "Emma", "magic")
+    assert generator.budget.max_tokens(1000, prompt) < 300
+    assert generator.budget.max_tokens(1000, [{"role": "user", "content": "x" * 4000}]) == 1
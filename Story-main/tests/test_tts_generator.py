@@ -0,0 +1,41 @@
+from src.tts_generator import split_text, strip_id3
+
+FRAMES = b"\xff\xfb\x90\x64" + bytes(200)
+TRAILER = b"TAG" + bytes(125)
+
+def id3_header(tag_size, footer=False):
+    syncsafe = bytes((tag_size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x04\x00" + (b"\x10" if footer else b"\x00") + syncsafe + bytes(tag_size) + (bytes(10) if footer else b"")
+
+def test_short_text_is_one_chunk():
+    assert split_text("First paragraph.\n\nSecond paragraph.", 100) == ["First paragraph.\nSecond paragraph."]
+
+def test_chunks_respect_the_limit_and_keep_every_word():
+    text = "\n\n".join(" ".join(f"Sentence {p}-{s} has a few words." for s in range(12)) for p in range(5))
+    chunks = split_text(text, 120)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+def test_long_paragraphs_split_at_sentence_ends():
+    text = " ".join(f"Sentence number {i} ends here." for i in range(20))
+    chunks = split_text(text, 100)
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+def test_overlong_sentences_are_cut_at_spaces():
+    text = " ".join(["word"] * 100)
+    chunks = split_text(text, 42)
+    assert all(len(chunk) <= 42 and chunk.split() == ["word"] * len(chunk.split()) for chunk in chunks)
+    assert " ".join(chunks) == text
+
+def test_blank_text_has_no_chunks():
+    assert split_text("\n \n", 100) == []
+
+def test_strip_id3_removes_header_and_trailer():
+    assert strip_id3(id3_header(300) + FRAMES + TRAILER) == FRAMES
+    assert strip_id3(id3_header(20, footer=True) + FRAMES) == FRAMES
+    assert strip_id3(FRAMES) == FRAMES
+
+def test_strip_id3_can_keep_the_header():
+    header = id3_header(300)
+    assert strip_id3(header + FRAMES + TRAILER, keep_header=True) == header + FRAMES